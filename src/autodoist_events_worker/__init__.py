@@ -1,3 +1,15 @@
-from .service import create_app
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .service import create_app
 
 __all__ = ["create_app"]
+
+
+def __getattr__(name: str) -> Any:
+    # Resolve the Flask service stack on first use so CLI/config paths stay light.
+    if name == "create_app":
+        from .service import create_app
+
+        return create_app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
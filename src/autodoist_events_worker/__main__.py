@@ -3,7 +3,6 @@ import sys
 from typing import Optional, Sequence
 
 from .config import EventsConfig
-from .service import create_app
 
 
 def main(argv: Optional[Sequence[str]] = None) -> int:
@@ -14,6 +13,8 @@ def main(argv: Optional[Sequence[str]] = None) -> int:
         print(f"Config error: {exc}", file=sys.stderr)
         return 2
 
+    from .service import create_app
+
     app = create_app(config)
     app.run(host=config.host, port=config.port)
     return 0
@@ -1,12 +1,110 @@
-import argparse
 import os
-from dataclasses import dataclass, field
-from typing import Optional, Sequence
+import sys
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Optional, Sequence
 
-from todoist_automation_shared import parse_bool, parse_csv_set
+from todoist_automation_shared import parse_bool, parse_csv_frozenset
 
+if TYPE_CHECKING:
+    import argparse
 
-@dataclass(frozen=True)
+
+def _optional_str(value: Optional[str]) -> Optional[str]:
+    return value
+
+
+_DEFAULT_KEEP_MARKERS: tuple[str, ...] = ("[openclaw:plan]",)
+_DEFAULT_ACTIVE_MINUTES: tuple[int, ...] = (0,)
+_DEFAULT_TETHER_TIMES: tuple[str, ...] = ("09:15", "13:30", "16:45")
+
+
+def _parse_str_tuple(value: str) -> tuple[str, ...]:
+    return tuple(x.strip() for x in value.split(",") if x.strip())
+
+
+# The tuple parsers return the shared default constant when the env var is unset,
+# so the common path skips the split/strip work entirely.
+def _parse_keep_markers(value: Optional[str]) -> tuple[str, ...]:
+    if value is None:
+        return _DEFAULT_KEEP_MARKERS
+    return _parse_str_tuple(value)
+
+
+def _parse_active_minutes(value: Optional[str]) -> tuple[int, ...]:
+    if value is None:
+        return _DEFAULT_ACTIVE_MINUTES
+    return tuple(int(x.strip()) for x in value.split(",") if x.strip()) or _DEFAULT_ACTIVE_MINUTES
+
+
+def _parse_tether_times(value: Optional[str]) -> tuple[str, ...]:
+    if value is None:
+        return _DEFAULT_TETHER_TIMES
+    return _parse_str_tuple(value) or _DEFAULT_TETHER_TIMES
+
+
+def _parse_hour_interval(value: str) -> int:
+    return max(1, int(value))
+
+
+# (field_name, env_key, parser, raw default passed to env.get)
+_ENV_FIELDS: tuple[tuple[str, str, Callable[[Any], Any], Optional[str]], ...] = (
+    ("todoist_api_token", "TODOIST_API_KEY", _optional_str, None),
+    ("webhook_client_secret", "TODOIST_CLIENT_SECRET", _optional_str, None),
+    ("todoist_client_id", "TODOIST_CLIENT_ID", _optional_str, None),
+    ("oauth_redirect_uri", "AUTODOIST_EVENTS_OAUTH_REDIRECT_URI", _optional_str, None),
+    ("db_path", "AUTODOIST_EVENTS_DB_PATH", str, "events.sqlite"),
+    ("enabled", "AUTODOIST_EVENTS_ENABLED", parse_bool, "true"),
+    ("dry_run", "AUTODOIST_EVENTS_DRY_RUN", parse_bool, "false"),
+    ("rule_recurring_clear_comments", "AUTODOIST_EVENTS_RULE_RECURRING_CLEAR_COMMENTS", parse_bool, "true"),
+    ("rule_recurring_purge_subtasks", "AUTODOIST_EVENTS_RULE_RECURRING_PURGE_SUBTASKS", parse_bool, "false"),
+    ("rule_reminder_notify", "AUTODOIST_EVENTS_RULE_REMINDER_NOTIFY", parse_bool, "false"),
+    ("allowed_user_ids", "AUTODOIST_EVENTS_ALLOWED_USER_IDS", parse_csv_frozenset, None),
+    ("allowed_project_ids", "AUTODOIST_EVENTS_ALLOWED_PROJECT_IDS", parse_csv_frozenset, None),
+    ("denied_project_ids", "AUTODOIST_EVENTS_DENIED_PROJECT_IDS", parse_csv_frozenset, None),
+    ("keep_markers", "AUTODOIST_EVENTS_KEEP_MARKERS", _parse_keep_markers, None),
+    ("max_delete_comments", "AUTODOIST_EVENTS_MAX_DELETE_COMMENTS", int, "200"),
+    ("max_delete_subtasks", "AUTODOIST_EVENTS_MAX_DELETE_SUBTASKS", int, "200"),
+    ("reminder_webhook_url", "AUTODOIST_EVENTS_REMINDER_WEBHOOK_URL", _optional_str, None),
+    ("reminder_webhook_token", "AUTODOIST_EVENTS_REMINDER_WEBHOOK_TOKEN", _optional_str, None),
+    ("reminder_require_focus_label", "AUTODOIST_EVENTS_REMINDER_REQUIRE_FOCUS_LABEL", parse_bool, "false"),
+    ("reminder_cooldown_minutes", "AUTODOIST_EVENTS_REMINDER_COOLDOWN_MINUTES", int, "60"),
+    ("reminder_timezone", "AUTODOIST_EVENTS_REMINDER_TIMEZONE", str, "America/Chicago"),
+    ("allowed_hour_start", "AUTODOIST_EVENTS_ALLOWED_HOUR_START", int, "9"),
+    ("allowed_hour_end", "AUTODOIST_EVENTS_ALLOWED_HOUR_END", int, "18"),
+    ("reminder_channel", "AUTODOIST_EVENTS_REMINDER_CHANNEL", str, "discord"),
+    ("reminder_to", "AUTODOIST_EVENTS_REMINDER_TO", _optional_str, None),
+    ("internal_token", "AUTODOIST_EVENTS_INTERNAL_TOKEN", _optional_str, None),
+    ("cron_timezone", "AUTODOIST_EVENTS_CRON_TIMEZONE", str, "America/Chicago"),
+    ("cron_allowed_hour_start", "AUTODOIST_EVENTS_CRON_ALLOWED_HOUR_START", int, "9"),
+    ("cron_allowed_hour_end", "AUTODOIST_EVENTS_CRON_ALLOWED_HOUR_END", int, "18"),
+    ("cron_prep_window_minutes", "AUTODOIST_EVENTS_CRON_PREP_WINDOW_MINUTES", int, "180"),
+    ("cron_exec_active_minutes", "AUTODOIST_EVENTS_CRON_EXEC_ACTIVE_MINUTES", _parse_active_minutes, None),
+    ("cron_prep_active_minutes", "AUTODOIST_EVENTS_CRON_PREP_ACTIVE_MINUTES", _parse_active_minutes, None),
+    ("cron_exec_active_hour_interval", "AUTODOIST_EVENTS_CRON_EXEC_ACTIVE_HOUR_INTERVAL", _parse_hour_interval, "3"),
+    ("cron_prep_active_hour_interval", "AUTODOIST_EVENTS_CRON_PREP_ACTIVE_HOUR_INTERVAL", _parse_hour_interval, "1"),
+    ("cron_no_focus_tether_times", "AUTODOIST_EVENTS_CRON_NO_FOCUS_TETHER_TIMES", _parse_tether_times, None),
+    ("cron_enable_no_focus_tether", "AUTODOIST_EVENTS_CRON_ENABLE_NO_FOCUS_TETHER", parse_bool, "true"),
+    ("admin_token", "AUTODOIST_EVENTS_ADMIN_TOKEN", _optional_str, None),
+    ("host", "AUTODOIST_EVENTS_HOST", str, "0.0.0.0"),
+    ("port", "AUTODOIST_EVENTS_PORT", int, "8081"),
+    ("timeout_s", "AUTODOIST_EVENTS_TIMEOUT_S", float, "10.0"),
+)
+
+# (argparse dest, field_name); a truthy CLI value wins over the env value.
+_CLI_OVERRIDES: tuple[tuple[str, str], ...] = (
+    ("api_key", "todoist_api_token"),
+    ("webhook_secret", "webhook_client_secret"),
+    ("client_id", "todoist_client_id"),
+    ("oauth_redirect_uri", "oauth_redirect_uri"),
+    ("db_path", "db_path"),
+    ("host", "host"),
+    ("port", "port"),
+    ("admin_token", "admin_token"),
+    ("timeout_s", "timeout_s"),
+)
+
+
+@dataclass(frozen=True, slots=True)
 class EventsConfig:
     todoist_api_token: str
     webhook_client_secret: str
@@ -18,10 +116,10 @@ class EventsConfig:
     rule_recurring_clear_comments: bool = True
     rule_recurring_purge_subtasks: bool = False
     rule_reminder_notify: bool = False
-    allowed_user_ids: set[str] = field(default_factory=set)
-    allowed_project_ids: set[str] = field(default_factory=set)
-    denied_project_ids: set[str] = field(default_factory=set)
-    keep_markers: tuple[str, ...] = ("[openclaw:plan]",)
+    allowed_user_ids: frozenset[str] = frozenset()
+    allowed_project_ids: frozenset[str] = frozenset()
+    denied_project_ids: frozenset[str] = frozenset()
+    keep_markers: tuple[str, ...] = _DEFAULT_KEEP_MARKERS
     max_delete_comments: int = 200
     max_delete_subtasks: int = 200
     reminder_webhook_url: Optional[str] = None
@@ -38,11 +136,11 @@ class EventsConfig:
     cron_allowed_hour_start: int = 9
     cron_allowed_hour_end: int = 18
     cron_prep_window_minutes: int = 180
-    cron_exec_active_minutes: tuple[int, ...] = (0,)
-    cron_prep_active_minutes: tuple[int, ...] = (0,)
+    cron_exec_active_minutes: tuple[int, ...] = _DEFAULT_ACTIVE_MINUTES
+    cron_prep_active_minutes: tuple[int, ...] = _DEFAULT_ACTIVE_MINUTES
     cron_exec_active_hour_interval: int = 3
     cron_prep_active_hour_interval: int = 1
-    cron_no_focus_tether_times: tuple[str, ...] = ("09:15", "13:30", "16:45")
+    cron_no_focus_tether_times: tuple[str, ...] = _DEFAULT_TETHER_TIMES
     cron_enable_no_focus_tether: bool = True
     admin_token: Optional[str] = None
     host: str = "0.0.0.0"
@@ -50,7 +148,9 @@ class EventsConfig:
     timeout_s: float = 10.0
 
     @staticmethod
-    def _parse_args(argv: Optional[Sequence[str]]) -> argparse.Namespace:
+    def _parse_args(argv: Optional[Sequence[str]]) -> "argparse.Namespace":
+        import argparse
+
         parser = argparse.ArgumentParser(description="Autodoist events worker")
         parser.add_argument("--api-key")
         parser.add_argument("--webhook-secret")
@@ -65,86 +165,33 @@ class EventsConfig:
 
     @classmethod
     def from_env_and_cli(cls, argv: Optional[Sequence[str]] = None) -> "EventsConfig":
-        args = cls._parse_args(argv)
-        api_key = args.api_key or os.getenv("TODOIST_API_KEY")
-        secret = args.webhook_secret or os.getenv("TODOIST_CLIENT_SECRET")
-        if not api_key:
+        if argv is None:
+            argv = sys.argv[1:]
+        # Env-only deployments pass no flags; skip importing/building argparse entirely.
+        args = cls._parse_args(argv) if argv else None
+        # Bind the env mapping once; every field below reads from it.
+        env = os.environ
+        kwargs: dict[str, Any] = {}
+        if args is not None:
+            for dest, name in _CLI_OVERRIDES:
+                value = getattr(args, dest)
+                if value:
+                    kwargs[name] = value
+
+        # Required keys are checked before any other env value is parsed, so a missing
+        # key is reported as such rather than as an unrelated parse error.
+        if not (kwargs.get("todoist_api_token") or env.get("TODOIST_API_KEY")):
             raise ValueError("TODOIST_API_KEY (or --api-key) is required")
-        if not secret:
+        if not (kwargs.get("webhook_client_secret") or env.get("TODOIST_CLIENT_SECRET")):
             raise ValueError("TODOIST_CLIENT_SECRET (or --webhook-secret) is required")
 
-        markers = os.getenv("AUTODOIST_EVENTS_KEEP_MARKERS", "[openclaw:plan]")
-        keep_markers = tuple(x.strip() for x in markers.split(",") if x.strip())
-        exec_active_minutes = tuple(
-            int(x.strip())
-            for x in os.getenv("AUTODOIST_EVENTS_CRON_EXEC_ACTIVE_MINUTES", "0").split(",")
-            if x.strip()
-        )
-        prep_active_minutes = tuple(
-            int(x.strip())
-            for x in os.getenv("AUTODOIST_EVENTS_CRON_PREP_ACTIVE_MINUTES", "0").split(",")
-            if x.strip()
-        )
-        no_focus_tether_times = tuple(
-            x.strip()
-            for x in os.getenv("AUTODOIST_EVENTS_CRON_NO_FOCUS_TETHER_TIMES", "09:15,13:30,16:45").split(",")
-            if x.strip()
-        )
-
-        return cls(
-            todoist_api_token=api_key,
-            webhook_client_secret=secret,
-            todoist_client_id=args.client_id or os.getenv("TODOIST_CLIENT_ID"),
-            oauth_redirect_uri=args.oauth_redirect_uri
-            or os.getenv("AUTODOIST_EVENTS_OAUTH_REDIRECT_URI"),
-            db_path=args.db_path or os.getenv("AUTODOIST_EVENTS_DB_PATH", "events.sqlite"),
-            enabled=parse_bool(os.getenv("AUTODOIST_EVENTS_ENABLED"), True),
-            dry_run=parse_bool(os.getenv("AUTODOIST_EVENTS_DRY_RUN"), False),
-            rule_recurring_clear_comments=parse_bool(
-                os.getenv("AUTODOIST_EVENTS_RULE_RECURRING_CLEAR_COMMENTS"), True
-            ),
-            rule_recurring_purge_subtasks=parse_bool(
-                os.getenv("AUTODOIST_EVENTS_RULE_RECURRING_PURGE_SUBTASKS"), False
-            ),
-            rule_reminder_notify=parse_bool(
-                os.getenv("AUTODOIST_EVENTS_RULE_REMINDER_NOTIFY"), False
-            ),
-            allowed_user_ids=parse_csv_set(os.getenv("AUTODOIST_EVENTS_ALLOWED_USER_IDS")),
-            allowed_project_ids=parse_csv_set(os.getenv("AUTODOIST_EVENTS_ALLOWED_PROJECT_IDS")),
-            denied_project_ids=parse_csv_set(os.getenv("AUTODOIST_EVENTS_DENIED_PROJECT_IDS")),
-            keep_markers=keep_markers,
-            max_delete_comments=int(os.getenv("AUTODOIST_EVENTS_MAX_DELETE_COMMENTS", "200")),
-            max_delete_subtasks=int(os.getenv("AUTODOIST_EVENTS_MAX_DELETE_SUBTASKS", "200")),
-            reminder_webhook_url=os.getenv("AUTODOIST_EVENTS_REMINDER_WEBHOOK_URL"),
-            reminder_webhook_token=os.getenv("AUTODOIST_EVENTS_REMINDER_WEBHOOK_TOKEN"),
-            reminder_require_focus_label=parse_bool(
-                os.getenv("AUTODOIST_EVENTS_REMINDER_REQUIRE_FOCUS_LABEL"), False
-            ),
-            reminder_cooldown_minutes=int(os.getenv("AUTODOIST_EVENTS_REMINDER_COOLDOWN_MINUTES", "60")),
-            reminder_timezone=os.getenv("AUTODOIST_EVENTS_REMINDER_TIMEZONE", "America/Chicago"),
-            allowed_hour_start=int(os.getenv("AUTODOIST_EVENTS_ALLOWED_HOUR_START", "9")),
-            allowed_hour_end=int(os.getenv("AUTODOIST_EVENTS_ALLOWED_HOUR_END", "18")),
-            reminder_channel=os.getenv("AUTODOIST_EVENTS_REMINDER_CHANNEL", "discord"),
-            reminder_to=os.getenv("AUTODOIST_EVENTS_REMINDER_TO"),
-            internal_token=os.getenv("AUTODOIST_EVENTS_INTERNAL_TOKEN"),
-            cron_timezone=os.getenv("AUTODOIST_EVENTS_CRON_TIMEZONE", "America/Chicago"),
-            cron_allowed_hour_start=int(os.getenv("AUTODOIST_EVENTS_CRON_ALLOWED_HOUR_START", "9")),
-            cron_allowed_hour_end=int(os.getenv("AUTODOIST_EVENTS_CRON_ALLOWED_HOUR_END", "18")),
-            cron_prep_window_minutes=int(os.getenv("AUTODOIST_EVENTS_CRON_PREP_WINDOW_MINUTES", "180")),
-            cron_exec_active_minutes=exec_active_minutes or (0,),
-            cron_prep_active_minutes=prep_active_minutes or (0,),
-            cron_exec_active_hour_interval=max(
-                1, int(os.getenv("AUTODOIST_EVENTS_CRON_EXEC_ACTIVE_HOUR_INTERVAL", "3"))
-            ),
-            cron_prep_active_hour_interval=max(
-                1, int(os.getenv("AUTODOIST_EVENTS_CRON_PREP_ACTIVE_HOUR_INTERVAL", "1"))
-            ),
-            cron_no_focus_tether_times=no_focus_tether_times or ("09:15", "13:30", "16:45"),
-            cron_enable_no_focus_tether=parse_bool(
-                os.getenv("AUTODOIST_EVENTS_CRON_ENABLE_NO_FOCUS_TETHER"), True
-            ),
-            admin_token=args.admin_token or os.getenv("AUTODOIST_EVENTS_ADMIN_TOKEN"),
-            host=args.host or os.getenv("AUTODOIST_EVENTS_HOST", "0.0.0.0"),
-            port=args.port or int(os.getenv("AUTODOIST_EVENTS_PORT", "8081")),
-            timeout_s=args.timeout_s or float(os.getenv("AUTODOIST_EVENTS_TIMEOUT_S", "10.0")),
-        )
+        for name, key, parser, default in _ENV_FIELDS:
+            # Fields set on the CLI never parse their env value.
+            if name in kwargs:
+                continue
+            raw = env.get(key, default)
+            try:
+                kwargs[name] = parser(raw)
+            except ValueError as exc:
+                raise ValueError(f"invalid {key}={raw!r}: {exc}") from exc
+        return cls(**kwargs)
@@ -1,7 +1,117 @@
 import json
 import sqlite3
+import sys
+import threading
 import time
-from typing import Any, Optional
+from contextlib import contextmanager
+from typing import Any, Iterable, Iterator, Optional
+
+# SQL is kept in module-level constants so every call hands sqlite3 the same
+# statement text and hits the connection's prepared-statement cache.
+_CACHED_STATEMENTS = 256
+
+# Shared compact encoder for summary_json/meta_json; smaller rows mean fewer WAL bytes.
+# ensure_ascii stays on so lone surrogates from task/comment text are stored as \uXXXX
+# escapes instead of failing to bind as UTF-8.
+_JSON_ENCODE = json.JSONEncoder(separators=(",", ":")).encode
+_EMPTY_JSON = "{}"
+
+# upsert_receipt relies on INSERT ... RETURNING.
+_MIN_SQLITE_VERSION = (3, 35, 0)
+
+# Bump whenever _SQL_SCHEMA changes so existing databases re-run the DDL once.
+_SCHEMA_VERSION = 1
+
+_SQL_SCHEMA = """
+CREATE TABLE IF NOT EXISTS event_receipts (
+  delivery_id TEXT PRIMARY KEY,
+  received_at_ms INTEGER NOT NULL,
+  event_name TEXT NOT NULL,
+  user_id TEXT,
+  triggered_at TEXT,
+  entity_type TEXT,
+  entity_id TEXT,
+  project_id TEXT,
+  status TEXT NOT NULL,
+  attempt_count INTEGER NOT NULL DEFAULT 1,
+  last_error TEXT,
+  summary_json TEXT,
+  payload_sha256 TEXT
+);
+
+CREATE TABLE IF NOT EXISTS action_outcomes (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  delivery_id TEXT NOT NULL,
+  rule_name TEXT NOT NULL,
+  action_type TEXT NOT NULL,
+  target_type TEXT NOT NULL,
+  target_id TEXT NOT NULL,
+  result TEXT NOT NULL,
+  meta_json TEXT,
+  UNIQUE(delivery_id, action_type, target_id)
+);
+
+CREATE TABLE IF NOT EXISTS reminder_notify_state (
+  task_id TEXT NOT NULL,
+  mode TEXT NOT NULL,
+  last_sent_at_ms INTEGER NOT NULL,
+  PRIMARY KEY(task_id, mode)
+);
+
+CREATE INDEX IF NOT EXISTS ix_receipts_received_at
+  ON event_receipts(received_at_ms DESC);
+
+CREATE INDEX IF NOT EXISTS ix_actions_delivery_id_id
+  ON action_outcomes(delivery_id, id);
+"""
+
+_SQL_UPSERT_RECEIPT = """
+INSERT INTO event_receipts (
+  delivery_id, received_at_ms, event_name, user_id, triggered_at,
+  entity_type, entity_id, project_id, status, payload_sha256
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(delivery_id) DO UPDATE SET
+  attempt_count = attempt_count + 1,
+  status = excluded.status
+RETURNING *
+"""
+
+_SQL_GET_RECEIPT = "SELECT * FROM event_receipts WHERE delivery_id = ?"
+
+_SQL_MARK_STATUS = """
+UPDATE event_receipts
+SET status = ?, summary_json = ?, last_error = ?
+WHERE delivery_id = ?
+"""
+
+_SQL_RECORD_ACTION = """
+INSERT INTO action_outcomes (
+  delivery_id, rule_name, action_type, target_type, target_id, result, meta_json
+) VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(delivery_id, action_type, target_id) DO UPDATE SET
+  result = excluded.result,
+  meta_json = excluded.meta_json
+"""
+
+_SQL_LIST_RECEIPTS = "SELECT * FROM event_receipts ORDER BY received_at_ms DESC LIMIT ?"
+
+_SQL_LIST_ACTIONS = "SELECT * FROM action_outcomes WHERE delivery_id = ? ORDER BY id ASC"
+
+_SQL_GET_LAST_REMINDER_NOTIFY = (
+    "SELECT last_sent_at_ms FROM reminder_notify_state WHERE task_id = ? AND mode = ?"
+)
+
+_SQL_MARK_REMINDER_NOTIFY_SENT = """
+INSERT INTO reminder_notify_state (task_id, mode, last_sent_at_ms)
+VALUES (?, ?, ?)
+ON CONFLICT(task_id, mode) DO UPDATE SET
+  last_sent_at_ms = excluded.last_sent_at_ms
+"""
+
+
+def _dict_row_factory(cursor: sqlite3.Cursor, row: tuple[Any, ...]) -> dict[str, Any]:
+    # Build result dicts directly instead of materializing sqlite3.Row and copying it.
+    return {col[0]: value for col, value in zip(cursor.description, row, strict=True)}
 
 
 class EventsDB:
@@ -9,16 +119,36 @@ class EventsDB:
         self._db_path = db_path
         self._auto_commit = auto_commit
         self._conn: Optional[sqlite3.Connection] = None
+        # Serializes writes on the shared connection so one thread's open transaction
+        # never absorbs (or rolls back) another thread's statements.
+        self._lock = threading.RLock()
+        self._tx_depth = 0
 
     def connect(self) -> None:
         if self._conn is not None:
             return
+        if sqlite3.sqlite_version_info < _MIN_SQLITE_VERSION:
+            raise RuntimeError(
+                f"SQLite {sqlite3.sqlite_version} is too old; "
+                f"{'.'.join(map(str, _MIN_SQLITE_VERSION))}+ is required"
+            )
         # Flask may serve requests from different threads; allow shared connection usage.
         # We run single-replica for this service, and keep WAL + busy_timeout enabled.
-        self._conn = sqlite3.connect(self._db_path, check_same_thread=False)
-        self._conn.row_factory = sqlite3.Row
+        self._conn = sqlite3.connect(
+            self._db_path, check_same_thread=False, cached_statements=_CACHED_STATEMENTS
+        )
+        self._conn.row_factory = _dict_row_factory
         self._conn.execute("PRAGMA journal_mode=WAL")
         self._conn.execute("PRAGMA busy_timeout=5000")
+        # NORMAL is durable across application crashes under WAL; only an OS crash can
+        # drop the most recent commits.
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA wal_autocheckpoint=1000")
+        # Admin list endpoints are read-heavy: map the file (256 MiB), keep ~32 MiB of
+        # pages cached, and keep any sort/temp spill in memory.
+        self._conn.execute("PRAGMA mmap_size=268435456")
+        self._conn.execute("PRAGMA cache_size=-32768")
+        self._conn.execute("PRAGMA temp_store=MEMORY")
         self._init_schema()
 
     def close(self) -> None:
@@ -35,45 +165,42 @@ class EventsDB:
     def commit(self) -> None:
         self.conn.commit()
 
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """Group the writes made inside the block into a single commit.
+
+        Rolls back if the block raises. Nested calls join the outermost transaction.
+        """
+        with self._lock:
+            if self._tx_depth:
+                self._tx_depth += 1
+                try:
+                    yield
+                finally:
+                    self._tx_depth -= 1
+                return
+
+            prev_auto_commit = self._auto_commit
+            self._auto_commit = False
+            self._tx_depth = 1
+            try:
+                yield
+            except BaseException:
+                self.conn.rollback()
+                raise
+            else:
+                self.conn.commit()
+            finally:
+                self._tx_depth = 0
+                self._auto_commit = prev_auto_commit
+
     def _init_schema(self) -> None:
-        self.conn.executescript(
-            """
-            CREATE TABLE IF NOT EXISTS event_receipts (
-              delivery_id TEXT PRIMARY KEY,
-              received_at_ms INTEGER NOT NULL,
-              event_name TEXT NOT NULL,
-              user_id TEXT,
-              triggered_at TEXT,
-              entity_type TEXT,
-              entity_id TEXT,
-              project_id TEXT,
-              status TEXT NOT NULL,
-              attempt_count INTEGER NOT NULL DEFAULT 1,
-              last_error TEXT,
-              summary_json TEXT,
-              payload_sha256 TEXT
-            );
-
-            CREATE TABLE IF NOT EXISTS action_outcomes (
-              id INTEGER PRIMARY KEY AUTOINCREMENT,
-              delivery_id TEXT NOT NULL,
-              rule_name TEXT NOT NULL,
-              action_type TEXT NOT NULL,
-              target_type TEXT NOT NULL,
-              target_id TEXT NOT NULL,
-              result TEXT NOT NULL,
-              meta_json TEXT,
-              UNIQUE(delivery_id, action_type, target_id)
-            );
-
-            CREATE TABLE IF NOT EXISTS reminder_notify_state (
-              task_id TEXT NOT NULL,
-              mode TEXT NOT NULL,
-              last_sent_at_ms INTEGER NOT NULL,
-              PRIMARY KEY(task_id, mode)
-            );
-            """
-        )
+        # The DDL is idempotent, but skipping it keeps reconnects from re-parsing it.
+        version = self.conn.execute("PRAGMA user_version").fetchone()["user_version"]
+        if version >= _SCHEMA_VERSION:
+            return
+        self.conn.executescript(_SQL_SCHEMA)
+        self.conn.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
         if self._auto_commit:
             self.commit()
 
@@ -90,42 +217,34 @@ class EventsDB:
         status: str,
         payload_sha256: Optional[str],
     ) -> tuple[bool, dict[str, Any]]:
-        now_ms = int(time.time() * 1000)
-        cur = self.conn.cursor()
-        cur.execute(
-            """
-            INSERT INTO event_receipts (
-              delivery_id, received_at_ms, event_name, user_id, triggered_at,
-              entity_type, entity_id, project_id, status, payload_sha256
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ON CONFLICT(delivery_id) DO UPDATE SET
-              attempt_count = attempt_count + 1,
-              status = excluded.status
-            """,
-            (
-                delivery_id,
-                now_ms,
-                event_name,
-                user_id,
-                triggered_at,
-                entity_type,
-                entity_id,
-                project_id,
-                status,
-                payload_sha256,
-            ),
-        )
-        cur.execute("SELECT * FROM event_receipts WHERE delivery_id = ?", (delivery_id,))
-        row = cur.fetchone()
-        if row is None:
-            raise RuntimeError("Failed to fetch upserted receipt")
+        now_ms = time.time_ns() // 1_000_000
+        with self._lock:
+            cur = self.conn.cursor()
+            cur.execute(
+                _SQL_UPSERT_RECEIPT,
+                (
+                    delivery_id,
+                    now_ms,
+                    event_name,
+                    user_id,
+                    triggered_at,
+                    entity_type,
+                    entity_id,
+                    project_id,
+                    status,
+                    payload_sha256,
+                ),
+            )
+            row = cur.fetchone()
+            cur.close()
+            if row is None:
+                raise RuntimeError("Failed to fetch upserted receipt")
 
-        if self._auto_commit:
-            self.commit()
+            if self._auto_commit:
+                self.commit()
 
-        receipt = dict(row)
-        is_new = receipt.get("attempt_count", 1) == 1
-        return is_new, receipt
+        is_new = row.get("attempt_count", 1) == 1
+        return is_new, row
 
     def mark_status(
         self,
@@ -135,16 +254,12 @@ class EventsDB:
         summary: Optional[dict[str, Any]] = None,
         error: Optional[str] = None,
     ) -> None:
-        self.conn.execute(
-            """
-            UPDATE event_receipts
-            SET status = ?, summary_json = ?, last_error = ?
-            WHERE delivery_id = ?
-            """,
-            (status, json.dumps(summary or {}), error, delivery_id),
-        )
-        if self._auto_commit:
-            self.commit()
+        status = sys.intern(status)
+        summary_json = _JSON_ENCODE(summary) if summary else _EMPTY_JSON
+        with self._lock:
+            self.conn.execute(_SQL_MARK_STATUS, (status, summary_json, error, delivery_id))
+            if self._auto_commit:
+                self.commit()
 
     def record_action(
         self,
@@ -156,65 +271,65 @@ class EventsDB:
         result: str,
         meta: Optional[dict[str, Any]] = None,
     ) -> None:
-        self.conn.execute(
-            """
-            INSERT INTO action_outcomes (
-              delivery_id, rule_name, action_type, target_type, target_id, result, meta_json
-            ) VALUES (?, ?, ?, ?, ?, ?, ?)
-            ON CONFLICT(delivery_id, action_type, target_id) DO UPDATE SET
-              result = excluded.result,
-              meta_json = excluded.meta_json
-            """,
-            (
-                delivery_id,
-                rule_name,
-                action_type,
-                target_type,
-                target_id,
-                result,
-                json.dumps(meta or {}),
-            ),
-        )
-        if self._auto_commit:
-            self.commit()
+        # These columns hold a small fixed vocabulary; interning keeps one str per value.
+        rule_name = sys.intern(rule_name)
+        action_type = sys.intern(action_type)
+        target_type = sys.intern(target_type)
+        result = sys.intern(result)
+        with self._lock:
+            self.conn.execute(
+                _SQL_RECORD_ACTION,
+                (
+                    delivery_id,
+                    rule_name,
+                    action_type,
+                    target_type,
+                    target_id,
+                    result,
+                    _JSON_ENCODE(meta) if meta else _EMPTY_JSON,
+                ),
+            )
+            if self._auto_commit:
+                self.commit()
+
+    def record_actions_bulk(
+        self,
+        rows: Iterable[tuple[str, str, str, str, str, str, Optional[dict[str, Any]]]],
+    ) -> None:
+        """Record many action outcomes with one executemany and a single commit.
+
+        Each row is ``(delivery_id, rule_name, action_type, target_type, target_id, result, meta)``.
+        """
+        params = [(*row[:6], _JSON_ENCODE(row[6]) if row[6] else _EMPTY_JSON) for row in rows]
+        if not params:
+            return
+        with self._lock:
+            self.conn.executemany(_SQL_RECORD_ACTION, params)
+            if self._auto_commit:
+                self.commit()
 
     def list_receipts(self, limit: int = 100) -> list[dict[str, Any]]:
-        cur = self.conn.execute(
-            "SELECT * FROM event_receipts ORDER BY received_at_ms DESC LIMIT ?", (limit,)
-        )
-        return [dict(r) for r in cur.fetchall()]
+        cur = self.conn.execute(_SQL_LIST_RECEIPTS, (limit,))
+        return cur.fetchall()
 
     def get_receipt(self, delivery_id: str) -> Optional[dict[str, Any]]:
-        cur = self.conn.execute("SELECT * FROM event_receipts WHERE delivery_id = ?", (delivery_id,))
-        row = cur.fetchone()
-        return dict(row) if row else None
+        cur = self.conn.execute(_SQL_GET_RECEIPT, (delivery_id,))
+        return cur.fetchone()
 
     def list_actions(self, delivery_id: str) -> list[dict[str, Any]]:
-        cur = self.conn.execute(
-            "SELECT * FROM action_outcomes WHERE delivery_id = ? ORDER BY id ASC", (delivery_id,)
-        )
-        return [dict(r) for r in cur.fetchall()]
+        cur = self.conn.execute(_SQL_LIST_ACTIONS, (delivery_id,))
+        return cur.fetchall()
 
     def get_last_reminder_notify_ms(self, task_id: str, mode: str) -> Optional[int]:
-        cur = self.conn.execute(
-            "SELECT last_sent_at_ms FROM reminder_notify_state WHERE task_id = ? AND mode = ?",
-            (task_id, mode),
-        )
+        cur = self.conn.execute(_SQL_GET_LAST_REMINDER_NOTIFY, (task_id, mode))
         row = cur.fetchone()
         if row is None:
             return None
         return int(row["last_sent_at_ms"])
 
     def mark_reminder_notify_sent(self, task_id: str, mode: str, sent_at_ms: Optional[int] = None) -> None:
-        value = int(sent_at_ms if sent_at_ms is not None else int(time.time() * 1000))
-        self.conn.execute(
-            """
-            INSERT INTO reminder_notify_state (task_id, mode, last_sent_at_ms)
-            VALUES (?, ?, ?)
-            ON CONFLICT(task_id, mode) DO UPDATE SET
-              last_sent_at_ms = excluded.last_sent_at_ms
-            """,
-            (task_id, mode, value),
-        )
-        if self._auto_commit:
-            self.commit()
+        value = int(sent_at_ms if sent_at_ms is not None else time.time_ns() // 1_000_000)
+        with self._lock:
+            self.conn.execute(_SQL_MARK_REMINDER_NOTIFY_SENT, (task_id, mode, value))
+            if self._auto_commit:
+                self.commit()
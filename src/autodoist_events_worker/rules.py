@@ -1,6 +1,11 @@
-from dataclasses import dataclass, field
+import re
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field, replace
 from datetime import date, datetime
-from typing import Any, Protocol
+from functools import lru_cache
+from itertools import islice
+from typing import Any, Callable, Protocol
 from zoneinfo import ZoneInfo
 
 from todoist_core.models import PolicyConfig, PolicyInput, TaskContext
@@ -12,7 +17,57 @@ from .db import EventsDB
 from .todoist_client import TodoistEventsClient
 
 
-@dataclass
+_DEFAULT_TZ_NAME = "America/Chicago"
+
+
+@lru_cache(maxsize=32)
+def _tz(name: str) -> ZoneInfo:
+    return ZoneInfo(name)
+
+
+# Reminder bursts repeat the same due strings; date/datetime results are immutable,
+# so caching the parse per raw value is safe.
+@lru_cache(maxsize=1024)
+def _parse_due_date_cached(value: str) -> date | None:
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=1024)
+def _parse_due_datetime_cached(value: str, tz_name: str) -> datetime | None:
+    try:
+        dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        if dt.tzinfo is None:
+            return dt.replace(tzinfo=_tz(tz_name))
+        return dt.astimezone(_tz(tz_name))
+    except Exception:
+        return None
+
+
+@lru_cache(maxsize=8)
+def _keep_marker_pattern(markers: tuple[str, ...]) -> re.Pattern[str] | None:
+    # keep_markers is fixed per config, so the case-insensitive alternation is compiled
+    # once and each comment is checked with a single anchored match().
+    if not markers:
+        return None
+    alternation = "|".join(map(re.escape, markers))
+    return re.compile(f"(?:{alternation})", re.IGNORECASE)
+
+
+@lru_cache(maxsize=2)
+def _reminder_policy_config(require_focus: bool) -> PolicyConfig:
+    # Shared across events; the only per-process input is the require-focus flag.
+    return PolicyConfig(
+        require_focus_for_reminder=require_focus,
+        # Reminder path should not inherit cron allowed-hour gates.
+        allowed_hour_start=0,
+        allowed_hour_end=24,
+    )
+
+
+@dataclass(slots=True)
 class Action:
     action_type: str
     target_id: str
@@ -20,14 +75,45 @@ class Action:
     meta: dict[str, Any] = field(default_factory=dict)
 
 
-@dataclass
+@dataclass(slots=True)
 class RuleContext:
     config: EventsConfig
     db: EventsDB
     todoist: TodoistEventsClient
+    # One RuleContext is built per delivery, so rules matching the same event share
+    # a single fetch of each Todoist resource.
+    _cache: dict[tuple[str, str], Any] = field(default_factory=dict, init=False, repr=False)
+    cache_hits: int = field(default=0, init=False)
+    cache_misses: int = field(default=0, init=False)
 
+    def _cached(self, kind: str, key: str, fetch: Callable[[str], Any]) -> Any:
+        cache_key = (kind, key)
+        if cache_key in self._cache:
+            self.cache_hits += 1
+            return self._cache[cache_key]
+        self.cache_misses += 1
+        value = self._cache[cache_key] = fetch(key)
+        return value
 
-@dataclass
+    def get_task(self, task_id: str) -> dict[str, Any]:
+        return self._cached("task", task_id, self.todoist.get_task)
+
+    def list_comments_for_task(self, task_id: str) -> list[dict[str, Any]]:
+        return self._cached("comments", task_id, self.todoist.list_comments_for_task)
+
+    def list_active_tasks_for_project(self, project_id: str) -> list[dict[str, Any]]:
+        return self._cached("project_tasks", project_id, self.todoist.list_active_tasks_for_project)
+
+    def list_active_subtasks(self, parent_id: str) -> list[dict[str, Any]]:
+        return self._cached("subtasks", parent_id, self.todoist.list_active_subtasks)
+
+    def is_recurring(self, task_id: str) -> bool:
+        # Derived from the memoized task, so only the underlying fetch is counted.
+        due = self.get_task(task_id).get("due") or {}
+        return bool(due.get("is_recurring"))
+
+
+@dataclass(frozen=True, slots=True)
 class TodoistWebhookEvent:
     delivery_id: str
     event_name: str
@@ -42,6 +128,8 @@ class TodoistWebhookEvent:
 
 class Rule(Protocol):
     name: str
+    # Event names the rule can match; used to index rules for dispatch.
+    events: frozenset[str]
 
     def matches(self, event: TodoistWebhookEvent) -> bool:
         ...
@@ -50,35 +138,39 @@ class Rule(Protocol):
         ...
 
 
+# Completion arrives either as item:completed or as item:updated with an
+# item_completed intent; both recurring rules match on these.
+_COMPLETION_EVENTS = frozenset({"item:completed"})
+_UPDATE_EVENTS = frozenset({"item:updated"})
+
+
 class RecurringClearCommentsOnCompletionRule:
     name = "recurring_clear_comments_on_completion"
+    events = _COMPLETION_EVENTS | _UPDATE_EVENTS
 
     def matches(self, event: TodoistWebhookEvent) -> bool:
         if event.task_id is None:
             return False
-        if event.event_name == "item:completed":
+        if event.event_name in _COMPLETION_EVENTS:
             return True
-        return event.event_name == "item:updated" and event.update_intent == "item_completed"
+        return event.event_name in _UPDATE_EVENTS and event.update_intent == "item_completed"
 
     def plan(self, ctx: RuleContext, event: TodoistWebhookEvent) -> tuple[list[Action], dict[str, Any]]:
         if event.task_id is None:
             return [], {"reason": "missing_task_id"}
 
-        task = ctx.todoist.get_task(event.task_id)
-        due = task.get("due") or {}
-        is_recurring = bool(due.get("is_recurring"))
-        if not is_recurring:
+        if not ctx.is_recurring(event.task_id):
             return [], {"reason": "not_recurring", "task_id": event.task_id}
 
-        comments = ctx.todoist.list_comments_for_task(event.task_id)
-        keep_markers = tuple(x.lower() for x in ctx.config.keep_markers)
+        comments = ctx.list_comments_for_task(event.task_id)
+        keep_re = _keep_marker_pattern(ctx.config.keep_markers)
 
         actions: list[Action] = []
         kept = 0
         for comment in comments:
             comment_id = str(comment.get("id"))
-            content = str(comment.get("content") or "").strip().lower()
-            if any(content.startswith(marker) for marker in keep_markers):
+            content = (comment.get("content") or "").lstrip()
+            if keep_re is not None and keep_re.match(content):
                 kept += 1
                 continue
             actions.append(Action(action_type="delete_comment", target_id=comment_id, meta={"task_id": event.task_id}))
@@ -101,27 +193,14 @@ class RecurringClearCommentsOnCompletionRule:
 
 class RecurringPurgeSubtasksOnCompletionRule:
     name = "recurring_purge_subtasks_on_completion"
+    events = _COMPLETION_EVENTS | _UPDATE_EVENTS
 
     def matches(self, event: TodoistWebhookEvent) -> bool:
         if event.task_id is None:
             return False
-        if event.event_name == "item:completed":
+        if event.event_name in _COMPLETION_EVENTS:
             return True
-        return event.event_name == "item:updated" and event.update_intent == "item_completed"
-
-    @staticmethod
-    def _task_id(x: dict[str, Any]) -> str:
-        return str(x.get("id") or "")
-
-    @staticmethod
-    def _parent_id(x: dict[str, Any]) -> str | None:
-        parent = x.get("parent_id")
-        if parent is None:
-            return None
-        parent_s = str(parent).strip()
-        if not parent_s:
-            return None
-        return parent_s
+        return event.event_name in _UPDATE_EVENTS and event.update_intent == "item_completed"
 
     def plan(self, ctx: RuleContext, event: TodoistWebhookEvent) -> tuple[list[Action], dict[str, Any]]:
         if event.task_id is None:
@@ -129,47 +208,59 @@ class RecurringPurgeSubtasksOnCompletionRule:
         if not event.project_id:
             return [], {"reason": "missing_project_id", "task_id": event.task_id}
 
-        parent_task = ctx.todoist.get_task(event.task_id)
-        due = parent_task.get("due") or {}
-        is_recurring = bool(due.get("is_recurring"))
-        if not is_recurring:
+        if not ctx.is_recurring(event.task_id):
             return [], {"reason": "not_recurring", "task_id": event.task_id}
 
-        tasks = ctx.todoist.list_active_tasks_for_project(event.project_id)
-        by_parent: dict[str, list[str]] = {}
+        # Most recurring tasks have no subtasks; a parent-scoped listing settles that
+        # without downloading the whole project.
+        if not ctx.list_active_subtasks(event.task_id):
+            return [], {
+                "task_id": event.task_id,
+                "is_recurring": True,
+                "subtasks_found": 0,
+                "delete_count": 0,
+                "cap_hit": False,
+                "dry_run": ctx.config.dry_run,
+            }
+
+        tasks = ctx.list_active_tasks_for_project(event.project_id)
+        by_parent: defaultdict[str, list[str]] = defaultdict(list)
         for task in tasks:
-            task_id = self._task_id(task)
-            if not task_id:
-                continue
-            parent_id = self._parent_id(task)
-            if not parent_id:
+            task_id = task.get("id")
+            parent_id = task.get("parent_id")
+            if not task_id or not parent_id:
                 continue
-            by_parent.setdefault(parent_id, []).append(task_id)
-
-        descendants: list[str] = []
-        stack: list[str] = [event.task_id]
-        seen: set[str] = set()
-        while stack:
-            cur = stack.pop()
-            for child in by_parent.get(cur, []):
-                if child in seen or child == event.task_id:
-                    continue
-                seen.add(child)
-                descendants.append(child)
-                stack.append(child)
-
-        # Delete deepest nodes first to avoid parent/child delete ordering issues.
-        actions = [Action(action_type="delete_task", target_type="task", target_id=task_id) for task_id in reversed(descendants)]
-        if len(actions) > ctx.config.max_delete_subtasks:
-            actions = actions[: ctx.config.max_delete_subtasks]
-            cap_hit = True
-        else:
-            cap_hit = False
+            by_parent[str(parent_id)].append(str(task_id))
+
+        # Level-order walk: each pass expands the whole frontier and filters it against
+        # `seen` in one batch, which also guards against parent_id cycles.
+        levels: list[list[str]] = []
+        seen: set[str] = {event.task_id}
+        frontier: list[str] = [event.task_id]
+        while frontier:
+            children: list[str] = []
+            for cur in frontier:
+                children.extend(by_parent.get(cur, ()))
+            frontier = [child for child in dict.fromkeys(children) if child not in seen]
+            seen.update(frontier)
+            if frontier:
+                levels.append(frontier)
+        subtasks_found = sum(map(len, levels))
+
+        # Delete deepest level first so children always go before their parents; only
+        # the capped prefix is turned into actions.
+        cap = max(0, ctx.config.max_delete_subtasks)
+        deepest_first = (task_id for level in reversed(levels) for task_id in reversed(level))
+        actions = [
+            Action(action_type="delete_task", target_type="task", target_id=task_id)
+            for task_id in islice(deepest_first, cap)
+        ]
+        cap_hit = subtasks_found > cap
 
         return actions, {
             "task_id": event.task_id,
             "is_recurring": True,
-            "subtasks_found": len(descendants),
+            "subtasks_found": subtasks_found,
             "delete_count": len(actions),
             "cap_hit": cap_hit,
             "dry_run": ctx.config.dry_run,
@@ -178,28 +269,19 @@ class RecurringPurgeSubtasksOnCompletionRule:
 
 class ReminderNotifyRule:
     name = "reminder_notify"
+    events = frozenset({"reminder:fired"})
 
     @staticmethod
     def _parse_due_date(value: str | None) -> date | None:
         if not value:
             return None
-        try:
-            return datetime.strptime(value, "%Y-%m-%d").date()
-        except Exception:
-            return None
+        return _parse_due_date_cached(value)
 
     @staticmethod
     def _parse_due_datetime(value: str | None, tz_name: str) -> datetime | None:
         if not value:
             return None
-        try:
-            normalized = value.replace("Z", "+00:00")
-            dt = datetime.fromisoformat(normalized)
-            if dt.tzinfo is None:
-                return dt.replace(tzinfo=ZoneInfo(tz_name))
-            return dt.astimezone(ZoneInfo(tz_name))
-        except Exception:
-            return None
+        return _parse_due_datetime_cached(value, tz_name)
 
     def matches(self, event: TodoistWebhookEvent) -> bool:
         return event.event_name == "reminder:fired" and event.task_id is not None
@@ -212,11 +294,15 @@ class ReminderNotifyRule:
         if not ctx.config.reminder_webhook_token:
             return [], {"reason": "missing_webhook_token", "task_id": event.task_id}
 
-        task = ctx.todoist.get_task(event.task_id)
+        task = ctx.get_task(event.task_id)
         task_content = str(task.get("content") or "").strip()
         due = task.get("due") or {}
-        labels = task.get("labels") or []
-        labels_lc = {str(x).strip().lower() for x in labels if str(x).strip()}
+        # One normalization pass per label (previously str().strip() ran twice).
+        labels_lc: set[str] = set()
+        for raw_label in task.get("labels") or ():
+            label = str(raw_label).strip().lower()
+            if label:
+                labels_lc.add(label)
         has_focus = "focus" in labels_lc
         due_date = self._parse_due_date(str(due.get("date")) if due.get("date") else None)
         due_dt_local = self._parse_due_datetime(
@@ -233,9 +319,9 @@ class ReminderNotifyRule:
             url=(str(task.get("url")) if task.get("url") else None),
         )
         try:
-            now_local = datetime.now(ZoneInfo(ctx.config.reminder_timezone))
+            now_local = datetime.now(_tz(ctx.config.reminder_timezone))
         except Exception:
-            now_local = datetime.now(ZoneInfo("America/Chicago"))
+            now_local = datetime.now(_tz(_DEFAULT_TZ_NAME))
         decision = evaluate_focus_policy(
             PolicyInput(
                 source="reminder",
@@ -243,12 +329,7 @@ class ReminderNotifyRule:
                 focus_tasks=(),
                 next_action_tasks=(),
                 reminder_task=task_ctx,
-                config=PolicyConfig(
-                    require_focus_for_reminder=ctx.config.reminder_require_focus_label,
-                    # Reminder path should not inherit cron allowed-hour gates.
-                    allowed_hour_start=0,
-                    allowed_hour_end=24,
-                ),
+                config=_reminder_policy_config(ctx.config.reminder_require_focus_label),
             )
         )
         if not decision.should_notify:
@@ -257,7 +338,7 @@ class ReminderNotifyRule:
         task_id = str(event.task_id)
         last_sent_ms = ctx.db.get_last_reminder_notify_ms(task_id, decision.mode)
         cooldown_ms = max(0, int(ctx.config.reminder_cooldown_minutes)) * 60_000
-        now_ms = int(now_local.timestamp() * 1000)
+        now_ms = time.time_ns() // 1_000_000
         if last_sent_ms is not None and cooldown_ms > 0 and (now_ms - last_sent_ms) < cooldown_ms:
             return [], {
                 "reason": "cooldown_active",
@@ -274,30 +355,18 @@ class ReminderNotifyRule:
             focus_tasks=(task_ctx,),
             next_action_tasks=(),
             reminder_task=task_ctx,
-            config=PolicyConfig(
-                require_focus_for_reminder=ctx.config.reminder_require_focus_label,
-                allowed_hour_start=0,
-                allowed_hour_end=24,
-            ),
+            config=_reminder_policy_config(ctx.config.reminder_require_focus_label),
         )
         message_decision = decision
         # Pre-due reminders should steer prep behavior, not pure execution.
         if task_ctx.due_datetime_local is not None and task_ctx.due_datetime_local > now_local:
-            message_decision = type(decision)(
-                should_notify=decision.should_notify,
-                mode="ACTIVE_FOCUS_PREP_WINDOW",
-                reason="reminder_before_due_datetime",
-                focus_task_id=decision.focus_task_id,
-                candidate_task_ids=decision.candidate_task_ids,
-            )
+            prep_reason = "reminder_before_due_datetime"
         elif task_ctx.due_date is not None and task_ctx.due_date > now_local.date():
-            message_decision = type(decision)(
-                should_notify=decision.should_notify,
-                mode="ACTIVE_FOCUS_PREP_WINDOW",
-                reason="reminder_before_due_date",
-                focus_task_id=decision.focus_task_id,
-                candidate_task_ids=decision.candidate_task_ids,
-            )
+            prep_reason = "reminder_before_due_date"
+        else:
+            prep_reason = None
+        if prep_reason is not None:
+            message_decision = replace(decision, mode="ACTIVE_FOCUS_PREP_WINDOW", reason=prep_reason)
 
         message = build_openclaw_message(message_decision, inp)
         target_to = ctx.config.reminder_to or ""
@@ -349,24 +418,34 @@ class ReminderNotifyRule:
         }
 
 
+# event_data keys holding the task id, in priority order. Reminder payloads carry the
+# reminder's own id in "id", so the task id comes from "item_id" first.
+_TASK_ID_KEYS: dict[str, tuple[str, str]] = {"reminder:fired": ("item_id", "id")}
+_DEFAULT_TASK_ID_KEYS: tuple[str, str] = ("id", "item_id")
+
+
+def _optional_str(value: Any) -> str | None:
+    # Todoist ids usually decode as str already; only coerce other JSON scalars.
+    if value is None or type(value) is str:
+        return value
+    return str(value)
+
+
 def parse_event(payload: dict[str, Any], delivery_id: str) -> TodoistWebhookEvent:
-    event_name = str(payload.get("event_name") or payload.get("eventName") or "")
-    event_data = payload.get("event_data") or {}
-    event_data_extra = payload.get("event_data_extra") or {}
-    if event_name == "reminder:fired":
-        task_id = event_data.get("item_id") or event_data.get("id")
-    else:
-        task_id = event_data.get("id") or event_data.get("item_id")
-    project_id = event_data.get("project_id")
+    get = payload.get
+    event_name = str(get("event_name") or get("eventName") or "")
+    event_data = get("event_data") or {}
+    data_get = event_data.get
+    first_key, second_key = _TASK_ID_KEYS.get(event_name, _DEFAULT_TASK_ID_KEYS)
 
     return TodoistWebhookEvent(
         delivery_id=delivery_id,
         event_name=event_name,
-        user_id=(str(payload.get("user_id")) if payload.get("user_id") is not None else None),
-        triggered_at=payload.get("triggered_at"),
-        task_id=(str(task_id) if task_id is not None else None),
-        project_id=(str(project_id) if project_id is not None else None),
-        update_intent=event_data_extra.get("update_intent"),
-        reminder_id=(str(event_data.get("id")) if event_name == "reminder:fired" and event_data.get("id") is not None else None),
+        user_id=_optional_str(get("user_id")),
+        triggered_at=get("triggered_at"),
+        task_id=_optional_str(data_get(first_key) or data_get(second_key)),
+        project_id=_optional_str(data_get("project_id")),
+        update_intent=(get("event_data_extra") or {}).get("update_intent"),
+        reminder_id=(_optional_str(data_get("id")) if event_name == "reminder:fired" else None),
         raw=payload,
     )
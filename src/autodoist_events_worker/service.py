@@ -1,4 +1,5 @@
 import hashlib
+import hmac
 import json
 import logging
 import uuid
@@ -17,33 +18,61 @@ from todoist_core.policy import evaluate_focus_policy
 from .config import EventsConfig
 from .db import EventsDB
 from .rules import (
+    Action,
     ReminderNotifyRule,
     RecurringClearCommentsOnCompletionRule,
     RecurringPurgeSubtasksOnCompletionRule,
+    Rule,
     RuleContext,
     parse_event,
 )
-from .todoist_client import TodoistEventsClient
+from .todoist_client import SYNC_COMMANDS_LIMIT, TodoistEventsClient
 
 LOG = logging.getLogger(__name__)
 
+# Delete actions are executed through the sync endpoint, batched per request.
+_SYNC_DELETE_COMMANDS = {"delete_comment": "note_delete", "delete_task": "item_delete"}
 
-def _is_admin_allowed(config: EventsConfig, auth_header: str | None) -> bool:
-    if not config.admin_token:
-        return False
+
+def _sync_delete_actions(
+    todoist: TodoistEventsClient,
+    actions: list[Action],
+    action_rows: list[tuple[Action, str, dict[str, Any]]],
+) -> int:
+    statuses = todoist.sync_delete([(_SYNC_DELETE_COMMANDS[a.action_type], a.target_id) for a in actions])
+    deleted = 0
+    for action, status in zip(actions, statuses, strict=True):
+        if status == "ok":
+            deleted += 1
+            action_rows.append((action, "success", action.meta))
+        else:
+            action_rows.append((action, "failed", {**action.meta, "reason": "sync_error", "error": status}))
+    return deleted
+
+
+def _expected_bearer(token: str | None) -> bytes | None:
+    # Built once in create_app so each request only strips and compares the header.
+    return f"Bearer {token}".encode("utf-8") if token else None
+
+
+def _bearer_matches(expected: bytes, auth_header: str | None) -> bool:
     if not auth_header:
         return False
-    return auth_header.strip() == f"Bearer {config.admin_token}"
+    return hmac.compare_digest(auth_header.strip().encode("utf-8"), expected)
+
+
+def _is_admin_allowed(expected_auth: bytes | None, auth_header: str | None) -> bool:
+    if not expected_auth:
+        return False
+    return _bearer_matches(expected_auth, auth_header)
 
 
-def _is_internal_allowed(config: EventsConfig, auth_header: str | None) -> bool:
+def _is_internal_allowed(expected_auth: bytes | None, auth_header: str | None) -> bool:
     # If no internal token configured, allow internal trigger calls from in-cluster callers.
     # When token is set, require exact bearer match.
-    if not config.internal_token:
+    if not expected_auth:
         return True
-    if not auth_header:
-        return False
-    return auth_header.strip() == f"Bearer {config.internal_token}"
+    return _bearer_matches(expected_auth, auth_header)
 
 
 def _parse_updated_at_local(raw: object, tz_name: str) -> datetime | None:
@@ -73,10 +102,29 @@ def _coerce_bool(value: object, default: bool) -> bool:
 
 def create_app(config: EventsConfig) -> Flask:
     app = Flask(__name__)
+    # Responses are machine-read; skip the per-response key sort jsonify does by default.
+    app.json.sort_keys = False
     db = EventsDB(config.db_path, auto_commit=True)
     db.connect()
     todoist = TodoistEventsClient(config.todoist_api_token, timeout_s=config.timeout_s)
-    rules = [RecurringClearCommentsOnCompletionRule(), RecurringPurgeSubtasksOnCompletionRule(), ReminderNotifyRule()]
+    admin_auth = _expected_bearer(config.admin_token)
+    internal_auth = _expected_bearer(config.internal_token)
+    # Config is fixed for the app's lifetime, so disabled rules are dropped here rather
+    # than skipped on every delivery.
+    rules: list[Rule] = [
+        rule
+        for rule, enabled in (
+            (RecurringClearCommentsOnCompletionRule(), config.rule_recurring_clear_comments),
+            (RecurringPurgeSubtasksOnCompletionRule(), config.rule_recurring_purge_subtasks),
+            (ReminderNotifyRule(), config.rule_reminder_notify),
+        )
+        if enabled
+    ]
+    # Index rules by event name once so each delivery only visits rules that can match it.
+    rules_by_event: dict[str, list[Rule]] = {}
+    for rule in rules:
+        for event_name in rule.events:
+            rules_by_event.setdefault(event_name, []).append(rule)
 
     @app.get("/health")
     def health() -> Any:
@@ -158,13 +206,13 @@ def create_app(config: EventsConfig) -> Flask:
 
     @app.get("/api/events")
     def api_events() -> Any:
-        if not _is_admin_allowed(config, request.headers.get("Authorization")):
+        if not _is_admin_allowed(admin_auth, request.headers.get("Authorization")):
             return jsonify({"ok": False, "error": "unauthorized"}), 401
         return jsonify({"ok": True, "items": db.list_receipts(limit=200)})
 
     @app.get("/api/events/<delivery_id>")
     def api_event(delivery_id: str) -> Any:
-        if not _is_admin_allowed(config, request.headers.get("Authorization")):
+        if not _is_admin_allowed(admin_auth, request.headers.get("Authorization")):
             return jsonify({"ok": False, "error": "unauthorized"}), 401
         receipt = db.get_receipt(delivery_id)
         if receipt is None:
@@ -173,7 +221,7 @@ def create_app(config: EventsConfig) -> Flask:
 
     @app.post("/internal/trigger")
     def internal_trigger() -> Any:
-        if not _is_internal_allowed(config, request.headers.get("Authorization")):
+        if not _is_internal_allowed(internal_auth, request.headers.get("Authorization")):
             return jsonify({"ok": False, "error": "unauthorized"}), 401
 
         body = request.get_json(silent=True) or {}
@@ -259,6 +307,7 @@ def create_app(config: EventsConfig) -> Flask:
         }
 
         delivery: dict[str, Any] = {"sent": False}
+        action_row: tuple[Any, ...] | None = None
         if decision.should_notify and deliver:
             if not config.reminder_webhook_url or not config.reminder_webhook_token:
                 summary["delivery"] = {"sent": False, "reason": "missing_webhook_config"}
@@ -287,7 +336,7 @@ def create_app(config: EventsConfig) -> Flask:
                         bearer_token=config.reminder_webhook_token,
                     )
                     status_code = int(response_meta.get("status_code") or 0)
-                    db.record_action(
+                    action_row = (
                         audit_id,
                         "internal_trigger",
                         "notify_webhook",
@@ -307,7 +356,11 @@ def create_app(config: EventsConfig) -> Flask:
         if not summary.get("delivery"):
             summary["delivery"] = delivery
 
-        db.mark_status(audit_id, "processed", summary=summary)
+        # The delivery row and the final status land in one commit.
+        with db.transaction():
+            if action_row is not None:
+                db.record_action(*action_row)
+            db.mark_status(audit_id, "processed", summary=summary)
         LOG.info(
             "internal_trigger_processed audit_id=%s source=%s decision=%s delivery=%s",
             audit_id,
@@ -361,7 +414,7 @@ def create_app(config: EventsConfig) -> Flask:
             return jsonify({"ok": False, "error": "invalid_signature"}), 401
 
         try:
-            payload = json.loads(raw.decode("utf-8"))
+            payload = json.loads(raw)
         except Exception:
             db.upsert_receipt(
                 delivery_id=delivery_id,
@@ -432,80 +485,75 @@ def create_app(config: EventsConfig) -> Flask:
             return jsonify({"ok": True, "delivery_id": delivery_id, "status": "ignored_allowlist"}), 200
 
         outcomes: list[dict[str, Any]] = []
+        # Audit rows for every rule are written with the final status in one commit.
+        audit_rows: list[tuple[str, str, str, str, str, str, dict[str, Any]]] = []
         try:
             db.mark_status(delivery_id, "processing")
             ctx = RuleContext(config=config, db=db, todoist=todoist)
-            for rule in rules:
-                if not config.rule_recurring_clear_comments and rule.name == "recurring_clear_comments_on_completion":
-                    continue
-                if not config.rule_recurring_purge_subtasks and rule.name == "recurring_purge_subtasks_on_completion":
-                    continue
-                if not config.rule_reminder_notify and rule.name == "reminder_notify":
-                    continue
+            for rule in rules_by_event.get(event.event_name, ()):
                 if not rule.matches(event):
                     continue
+                hits_before, misses_before = ctx.cache_hits, ctx.cache_misses
                 actions, plan_meta = rule.plan(ctx, event)
+                cache_meta = {
+                    "cache_hits": ctx.cache_hits - hits_before,
+                    "cache_misses": ctx.cache_misses - misses_before,
+                }
                 deleted = 0
-                for action in actions:
-                    if config.dry_run:
-                        db.record_action(
-                            delivery_id,
-                            rule.name,
-                            action.action_type,
-                            action.target_type,
-                            action.target_id,
-                            "skipped",
-                            {**action.meta, "reason": "dry_run"},
-                        )
-                        continue
-                    if action.action_type == "delete_comment":
-                        todoist.delete_comment(action.target_id)
-                    elif action.action_type == "delete_task":
-                        todoist.delete_task(action.target_id)
-                    elif action.action_type == "notify_webhook":
-                        payload = action.meta.get("payload")
-                        if not isinstance(payload, dict):
-                            db.record_action(
-                                delivery_id,
-                                rule.name,
-                                action.action_type,
-                                action.target_type,
-                                action.target_id,
-                                "failed",
-                                {**action.meta, "reason": "missing_payload"},
+                action_rows: list[tuple[Action, str, dict[str, Any]]] = []
+                # Consecutive deletes are sent as one sync request; order is preserved so
+                # deepest-first subtask deletes still run children before parents.
+                pending_deletes: list[Action] = []
+                try:
+                    for action in actions:
+                        if config.dry_run:
+                            action_rows.append((action, "skipped", {**action.meta, "reason": "dry_run"}))
+                            continue
+                        if action.action_type in _SYNC_DELETE_COMMANDS:
+                            pending_deletes.append(action)
+                            if len(pending_deletes) == SYNC_COMMANDS_LIMIT:
+                                deleted += _sync_delete_actions(todoist, pending_deletes, action_rows)
+                                pending_deletes = []
+                            continue
+                        if pending_deletes:
+                            deleted += _sync_delete_actions(todoist, pending_deletes, action_rows)
+                            pending_deletes = []
+                        if action.action_type == "notify_webhook":
+                            payload = action.meta.get("payload")
+                            if not isinstance(payload, dict):
+                                action_rows.append((action, "failed", {**action.meta, "reason": "missing_payload"}))
+                                continue
+                            response_meta = todoist.post_webhook(
+                                url=action.target_id,
+                                payload=payload,
+                                bearer_token=config.reminder_webhook_token,
                             )
+                            if rule.name == "reminder_notify":
+                                task_id = str(action.meta.get("task_id") or "")
+                                mode = str(action.meta.get("policy_mode") or "")
+                                if task_id and mode:
+                                    db.mark_reminder_notify_sent(task_id, mode)
+                            action.meta = {**action.meta, "response": response_meta}
+                        else:
+                            action_rows.append((action, "failed", {**action.meta, "reason": "unknown_action_type"}))
                             continue
-                        response_meta = todoist.post_webhook(
-                            url=action.target_id,
-                            payload=payload,
-                            bearer_token=config.reminder_webhook_token,
-                        )
-                        if rule.name == "reminder_notify":
-                            task_id = str(action.meta.get("task_id") or "")
-                            mode = str(action.meta.get("policy_mode") or "")
-                            if task_id and mode:
-                                db.mark_reminder_notify_sent(task_id, mode)
-                        action.meta = {**action.meta, "response": response_meta}
-                    else:
-                        db.record_action(
+                        deleted += 1
+                        action_rows.append((action, "success", action.meta))
+                    if pending_deletes:
+                        deleted += _sync_delete_actions(todoist, pending_deletes, action_rows)
+                finally:
+                    # Keep rows even when an action raised so already-applied changes stay audited.
+                    audit_rows.extend(
+                        (
                             delivery_id,
                             rule.name,
                             action.action_type,
                             action.target_type,
                             action.target_id,
-                            "failed",
-                            {**action.meta, "reason": "unknown_action_type"},
+                            result,
+                            meta,
                         )
-                        continue
-                    deleted += 1
-                    db.record_action(
-                        delivery_id,
-                        rule.name,
-                        action.action_type,
-                        action.target_type,
-                        action.target_id,
-                        "success",
-                        action.meta,
+                        for action, result, meta in action_rows
                     )
                 if (
                     rule.name == "reminder_notify"
@@ -516,13 +564,19 @@ def create_app(config: EventsConfig) -> Flask:
                         delivery_id,
                         plan_meta.get("task_id"),
                     )
-                outcomes.append({"rule": rule.name, **plan_meta, "deleted": deleted})
+                outcomes.append({"rule": rule.name, **plan_meta, **cache_meta, "deleted": deleted})
 
             if not outcomes:
-                db.mark_status(delivery_id, "processed", summary={"rules_triggered": 0})
+                with db.transaction():
+                    db.record_actions_bulk(audit_rows)
+                    db.mark_status(delivery_id, "processed", summary={"rules_triggered": 0})
                 LOG.info("webhook_processed delivery_id=%s rules_triggered=0", delivery_id)
             else:
-                db.mark_status(delivery_id, "processed", summary={"rules_triggered": len(outcomes), "outcomes": outcomes})
+                with db.transaction():
+                    db.record_actions_bulk(audit_rows)
+                    db.mark_status(
+                        delivery_id, "processed", summary={"rules_triggered": len(outcomes), "outcomes": outcomes}
+                    )
                 LOG.info(
                     "webhook_processed delivery_id=%s rules_triggered=%s outcomes=%s",
                     delivery_id,
@@ -532,7 +586,9 @@ def create_app(config: EventsConfig) -> Flask:
             return jsonify({"ok": True, "delivery_id": delivery_id, "duplicate": False, "outcomes": outcomes}), 200
         except Exception as exc:  # transient failure path
             LOG.exception("Failed processing delivery_id=%s", delivery_id)
-            db.mark_status(delivery_id, "error", error=str(exc))
+            with db.transaction():
+                db.record_actions_bulk(audit_rows)
+                db.mark_status(delivery_id, "error", error=str(exc))
             return jsonify({"ok": False, "delivery_id": delivery_id, "error": "transient_processing_failure"}), 500
 
     return app
@@ -1,6 +1,22 @@
-from typing import Any
+import threading
+import time
+import uuid
+from typing import Any, Sequence
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Todoist caps a single sync request at 100 commands.
+SYNC_COMMANDS_LIMIT = 100
+
+# Todoist often sends item:completed and item:updated(item_completed) for the same task
+# within milliseconds; a few seconds of reuse dedupes that burst across deliveries.
+_TASK_CACHE_TTL_S = 5.0
+_TASK_CACHE_MAX = 1024
+
+_COMMENTS_PAGE_LIMIT = 200
+_COMMENTS_MAX_PAGES = 50
 
 
 class TodoistEventsClient:
@@ -12,21 +28,119 @@ class TodoistEventsClient:
             "Authorization": f"Bearer {api_key}",
             "Content-Type": "application/json",
         }
+        # Keep-alive pool for api.todoist.com so the task lookup, comment listing and
+        # sync deletes of one delivery share a single TLS connection. Only GETs are
+        # retried; sync POSTs are left to the webhook redelivery. Retries run
+        # inside the webhook handler, so read timeouts are not retried and Retry-After is
+        # ignored: the worst case stays at timeout_s plus ~1.4s of backoff.
+        self._session = requests.Session()
+        self._session.headers.update(self.headers)
+        retry = Retry(
+            total=3,
+            read=0,
+            backoff_factor=0.2,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset({"GET"}),
+            respect_retry_after_header=False,
+            raise_on_status=False,
+        )
+        self._session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry))
+        # Separate pool without the Todoist Authorization header for third-party hosts
+        # (reminder webhooks, OAuth exchange).
+        self._external_session = requests.Session()
+        self._task_cache: dict[str, tuple[float, dict[str, Any]]] = {}
+        self._task_cache_lock = threading.Lock()
+        self._task_fetch_locks: dict[str, threading.Lock] = {}
+
+    def close(self) -> None:
+        self._session.close()
+        self._external_session.close()
 
     def get_task(self, task_id: str) -> dict[str, Any]:
-        resp = requests.get(
-            f"{self.base_url}/tasks/{task_id}", headers=self.headers, timeout=self.timeout_s
-        )
+        """Fetch a task, reusing a fetch from the last _TASK_CACHE_TTL_S seconds.
+
+        The cache is shared across deliveries, so a task edited inside that window
+        (e.g. recurrence removed) can be served stale for up to 5s; that is accepted to
+        dedupe completion bursts. Concurrent lookups of one task share a single fetch.
+        """
+        task = self._cached_task(task_id)
+        if task is not None:
+            return task
+        with self._task_cache_lock:
+            fetch_lock = self._task_fetch_locks.setdefault(task_id, threading.Lock())
+        try:
+            with fetch_lock:
+                task = self._cached_task(task_id)
+                if task is None:
+                    task = self._fetch_task(task_id)
+        finally:
+            with self._task_cache_lock:
+                self._task_fetch_locks.pop(task_id, None)
+        return task
+
+    def _cached_task(self, task_id: str) -> dict[str, Any] | None:
+        with self._task_cache_lock:
+            cached = self._task_cache.get(task_id)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+        return None
+
+    def _fetch_task(self, task_id: str) -> dict[str, Any]:
+        resp = self._session.get(f"{self.base_url}/tasks/{task_id}", timeout=self.timeout_s)
         resp.raise_for_status()
-        return resp.json()
+        task = resp.json()
+        now = time.monotonic()
+        with self._task_cache_lock:
+            if len(self._task_cache) >= _TASK_CACHE_MAX:
+                self._task_cache = {k: v for k, v in self._task_cache.items() if v[0] > now}
+                if len(self._task_cache) >= _TASK_CACHE_MAX:
+                    self._task_cache.pop(next(iter(self._task_cache)))
+            self._task_cache[task_id] = (now + _TASK_CACHE_TTL_S, task)
+        return task
+
+    def _forget_tasks(self, task_ids: Sequence[str]) -> None:
+        with self._task_cache_lock:
+            for task_id in task_ids:
+                self._task_cache.pop(task_id, None)
 
     def list_comments_for_task(self, task_id: str) -> list[dict[str, Any]]:
         # Todoist returns {"results":[...], "next_cursor": "..."} for this endpoint.
-        # We currently process the first page only.
-        resp = requests.get(
-            f"{self.base_url}/comments",
-            headers=self.headers,
-            params={"task_id": task_id},
+        # Pages are requested at the maximum size and followed until the cursor runs out.
+        # A repeated cursor or the page cap ends the loop, so a misbehaving response
+        # cannot turn one rule evaluation into unbounded requests. Comments are deduped
+        # by id so a re-served page cannot plan the same delete twice.
+        params: dict[str, Any] = {"task_id": task_id, "limit": _COMMENTS_PAGE_LIMIT}
+        comments: list[dict[str, Any]] = []
+        seen_ids: set[Any] = set()
+        seen_cursors: set[str] = set()
+        for _ in range(_COMMENTS_MAX_PAGES):
+            resp = self._session.get(f"{self.base_url}/comments", params=params, timeout=self.timeout_s)
+            resp.raise_for_status()
+            data = resp.json()
+            if isinstance(data, list):
+                return data
+            if not isinstance(data, dict):
+                return comments
+            results = data.get("results")
+            if isinstance(results, list):
+                for comment in results:
+                    comment_id = comment.get("id") if isinstance(comment, dict) else None
+                    if comment_id is not None:
+                        if comment_id in seen_ids:
+                            continue
+                        seen_ids.add(comment_id)
+                    comments.append(comment)
+            next_cursor = data.get("next_cursor")
+            if not next_cursor or not results or next_cursor in seen_cursors:
+                return comments
+            seen_cursors.add(next_cursor)
+            params["cursor"] = next_cursor
+        return comments
+
+    def list_active_tasks_for_project(self, project_id: str) -> list[dict[str, Any]]:
+        resp = self._session.get(
+            f"{self.base_url}/tasks",
+            params={"project_id": project_id},
             timeout=self.timeout_s,
         )
         resp.raise_for_status()
@@ -39,18 +153,11 @@ class TodoistEventsClient:
                 return results
         return []
 
-    def delete_comment(self, comment_id: str) -> None:
-        resp = requests.delete(
-            f"{self.base_url}/comments/{comment_id}", headers=self.headers, timeout=self.timeout_s
-        )
-        if resp.status_code not in (200, 204):
-            resp.raise_for_status()
-
-    def list_active_tasks_for_project(self, project_id: str) -> list[dict[str, Any]]:
-        resp = requests.get(
+    def list_active_subtasks(self, parent_id: str) -> list[dict[str, Any]]:
+        # Direct children only; the server-side filter keeps the payload to the subtasks.
+        resp = self._session.get(
             f"{self.base_url}/tasks",
-            headers=self.headers,
-            params={"project_id": project_id},
+            params={"parent_id": parent_id},
             timeout=self.timeout_s,
         )
         resp.raise_for_status()
@@ -64,9 +171,8 @@ class TodoistEventsClient:
         return []
 
     def list_all_active_tasks(self) -> list[dict[str, Any]]:
-        resp = requests.get(
+        resp = self._session.get(
             f"{self.base_url}/tasks",
-            headers=self.headers,
             timeout=self.timeout_s,
         )
         resp.raise_for_status()
@@ -79,12 +185,26 @@ class TodoistEventsClient:
                 return results
         return []
 
-    def delete_task(self, task_id: str) -> None:
-        resp = requests.delete(
-            f"{self.base_url}/tasks/{task_id}", headers=self.headers, timeout=self.timeout_s
+    def sync_delete(self, commands: Sequence[tuple[str, str]]) -> list[Any]:
+        """Run (command_type, id) delete commands in one sync request.
+
+        Returns the per-command sync status in input order: "ok" or the error object.
+        """
+        if len(commands) > SYNC_COMMANDS_LIMIT:
+            raise ValueError(f"at most {SYNC_COMMANDS_LIMIT} sync commands per request")
+        payload = [
+            {"type": command_type, "uuid": str(uuid.uuid4()), "args": {"id": resource_id}}
+            for command_type, resource_id in commands
+        ]
+        self._forget_tasks([resource_id for command_type, resource_id in commands if command_type == "item_delete"])
+        resp = self._session.post(
+            f"{self.base_url}/sync",
+            json={"commands": payload},
+            timeout=self.timeout_s,
         )
-        if resp.status_code not in (200, 204):
-            resp.raise_for_status()
+        resp.raise_for_status()
+        sync_status = (resp.json() or {}).get("sync_status") or {}
+        return [sync_status.get(cmd["uuid"], "missing_status") for cmd in payload]
 
     def post_webhook(
         self,
@@ -96,7 +216,7 @@ class TodoistEventsClient:
         headers = {"Content-Type": "application/json"}
         if bearer_token:
             headers["Authorization"] = f"Bearer {bearer_token}"
-        resp = requests.post(url, json=payload, headers=headers, timeout=self.timeout_s)
+        resp = self._external_session.post(url, json=payload, headers=headers, timeout=self.timeout_s)
         resp.raise_for_status()
         out: dict[str, Any] = {"status_code": resp.status_code}
         try:
@@ -114,7 +234,7 @@ class TodoistEventsClient:
         redirect_uri: str,
     ) -> dict[str, Any]:
         # Todoist OAuth token exchange endpoint.
-        resp = requests.post(
+        resp = self._external_session.post(
             "https://todoist.com/oauth/access_token",
             data={
                 "client_id": client_id,
@@ -1,5 +1,5 @@
 """Shared Todoist automation primitives for multiple repos."""
 
-from .webhook import verify_todoist_signature, parse_csv_set, parse_bool
+from .webhook import verify_todoist_signature, parse_csv_frozenset, parse_csv_set, parse_bool
 
-__all__ = ["verify_todoist_signature", "parse_csv_set", "parse_bool"]
+__all__ = ["verify_todoist_signature", "parse_csv_frozenset", "parse_csv_set", "parse_bool"]
@@ -1,6 +1,9 @@
 import base64
+import binascii
 import hashlib
 import hmac
+import re
+from functools import lru_cache
 from typing import Optional
 
 
@@ -16,6 +19,22 @@ def parse_csv_set(value: Optional[str]) -> set[str]:
     return {part.strip() for part in value.split(",") if part.strip()}
 
 
+def parse_csv_frozenset(value: Optional[str]) -> frozenset[str]:
+    if not value:
+        return frozenset()
+    return frozenset(part.strip() for part in value.split(",") if part.strip())
+
+
+_SHA256_SIZE = hashlib.sha256().digest_size
+_HEX_SHA256 = re.compile(f"[0-9a-f]{{{2 * _SHA256_SIZE}}}")
+
+
+@lru_cache(maxsize=4)
+def _hmac_template(client_secret: str) -> "hmac.HMAC":
+    # The secret is fixed per process; keying once lets each request start from a copy.
+    return hmac.new(client_secret.encode("utf-8"), digestmod=hashlib.sha256)
+
+
 def verify_todoist_signature(raw_body: bytes, header_sig: str, *, client_secret: str) -> bool:
     """Verify Todoist webhook signature over raw body.
 
@@ -24,9 +43,22 @@ def verify_todoist_signature(raw_body: bytes, header_sig: str, *, client_secret:
     if not header_sig:
         return False
 
-    digest = hmac.new(client_secret.encode("utf-8"), raw_body, hashlib.sha256).digest()
-    expected_b64 = base64.b64encode(digest).decode("utf-8")
-    expected_hex = digest.hex()
+    # Check the header's shape before hashing, so malformed signatures are rejected
+    # without running HMAC over the body. Hex SHA-256 is 64 chars and base64 is 44,
+    # so only the one matching expected form is built.
     header = header_sig.strip()
+    header_digest: Optional[bytes] = None
+    if _HEX_SHA256.fullmatch(header) is None:
+        try:
+            header_digest = base64.b64decode(header, validate=True)
+        except (binascii.Error, ValueError):
+            return False
+        if len(header_digest) != _SHA256_SIZE:
+            return False
 
-    return hmac.compare_digest(header, expected_b64) or hmac.compare_digest(header, expected_hex)
+    mac = _hmac_template(client_secret).copy()
+    mac.update(raw_body)
+    digest = mac.digest()
+    if header_digest is None:
+        return hmac.compare_digest(header, digest.hex())
+    return hmac.compare_digest(header_digest, digest)
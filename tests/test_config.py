@@ -1,3 +1,5 @@
+import pytest
+
 from autodoist_events_worker.config import EventsConfig
 
 
@@ -9,3 +11,31 @@ def test_config_reads_reminder_timezone_from_env(monkeypatch) -> None:
     cfg = EventsConfig.from_env_and_cli([])
 
     assert cfg.reminder_timezone == "UTC"
+
+
+def test_config_cli_args_override_env(monkeypatch) -> None:
+    monkeypatch.setenv("TODOIST_API_KEY", "x")
+    monkeypatch.setenv("TODOIST_CLIENT_SECRET", "y")
+    monkeypatch.setenv("AUTODOIST_EVENTS_PORT", "9000")
+
+    assert EventsConfig.from_env_and_cli([]).port == 9000
+    assert EventsConfig.from_env_and_cli(["--port", "9100"]).port == 9100
+
+
+def test_config_cli_port_skips_invalid_env_port(monkeypatch) -> None:
+    monkeypatch.setenv("TODOIST_API_KEY", "x")
+    monkeypatch.setenv("TODOIST_CLIENT_SECRET", "y")
+    monkeypatch.setenv("AUTODOIST_EVENTS_PORT", "not-a-port")
+
+    assert EventsConfig.from_env_and_cli(["--port", "9100"]).port == 9100
+    with pytest.raises(ValueError, match="AUTODOIST_EVENTS_PORT"):
+        EventsConfig.from_env_and_cli([])
+
+
+def test_config_reports_missing_key_before_parse_errors(monkeypatch) -> None:
+    monkeypatch.delenv("TODOIST_API_KEY", raising=False)
+    monkeypatch.setenv("TODOIST_CLIENT_SECRET", "y")
+    monkeypatch.setenv("AUTODOIST_EVENTS_MAX_DELETE_COMMENTS", "lots")
+
+    with pytest.raises(ValueError, match="TODOIST_API_KEY"):
+        EventsConfig.from_env_and_cli([])
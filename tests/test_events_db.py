@@ -39,3 +39,46 @@ def test_reminder_notify_state_roundtrip(tmp_path) -> None:
     assert db.get_last_reminder_notify_ms("t1", "REMINDER_FOCUS") is None
     db.mark_reminder_notify_sent("t1", "REMINDER_FOCUS", sent_at_ms=12345)
     assert db.get_last_reminder_notify_ms("t1", "REMINDER_FOCUS") == 12345
+
+
+def test_transaction_commits_once_and_rolls_back_on_error(tmp_path) -> None:
+    path = str(tmp_path / "events.sqlite")
+    db = EventsDB(path, auto_commit=True)
+    db.connect()
+    with db.transaction():
+        db.record_action("d1", "rule", "delete_comment", "comment", "c1", "success")
+        db.record_action("d1", "rule", "delete_comment", "comment", "c2", "success")
+
+    try:
+        with db.transaction():
+            db.record_action("d1", "rule", "delete_comment", "comment", "c3", "success")
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+
+    reader = EventsDB(path)
+    reader.connect()
+    assert [a["target_id"] for a in reader.list_actions("d1")] == ["c1", "c2"]
+
+
+def test_record_actions_bulk(tmp_path) -> None:
+    db = EventsDB(str(tmp_path / "events.sqlite"), auto_commit=True)
+    db.connect()
+    db.record_actions_bulk(
+        [
+            ("d1", "rule", "delete_task", "task", "t1", "success", {"task_id": "p"}),
+            ("d1", "rule", "delete_task", "task", "t2", "skipped", None),
+        ]
+    )
+    actions = db.list_actions("d1")
+    assert [(a["target_id"], a["result"]) for a in actions] == [("t1", "success"), ("t2", "skipped")]
+    assert actions[0]["meta_json"] == '{"task_id":"p"}'
+    assert actions[1]["meta_json"] == "{}"
+
+
+def test_record_action_escapes_lone_surrogates(tmp_path) -> None:
+    db = EventsDB(str(tmp_path / "events.sqlite"), auto_commit=True)
+    db.connect()
+    db.record_action("d1", "rule", "delete_comment", "comment", "c1", "success", {"content": "bad \ud83d"})
+    db.mark_status("d1", "processed", summary={"content": "bad \ud83d"})
+    assert db.list_actions("d1")[0]["meta_json"] == '{"content":"bad \\ud83d"}'
@@ -1,3 +1,5 @@
+from unittest.mock import patch
+
 from autodoist_events_worker.config import EventsConfig
 from autodoist_events_worker.rules import (
     ReminderNotifyRule,
@@ -7,6 +9,7 @@ from autodoist_events_worker.rules import (
     TodoistWebhookEvent,
     parse_event,
 )
+from autodoist_events_worker.todoist_client import TodoistEventsClient
 
 
 class FakeTodoist:
@@ -52,6 +55,9 @@ class FakeTodoist:
             {"id": "gc1", "project_id": project_id, "parent_id": "c1"},
         ]
 
+    def list_active_subtasks(self, parent_id: str):
+        return [t for t in self.list_active_tasks_for_project("p1") if t["parent_id"] == parent_id]
+
 
 class FakeDB:
     def __init__(self) -> None:
@@ -117,6 +123,43 @@ def test_rule_plan_keeps_markers_and_deletes_others() -> None:
     assert meta["kept_count"] == 1
 
 
+def test_rule_plan_deletes_comment_once_on_repeated_cursor() -> None:
+    class _Resp:
+        status_code = 200
+
+        def __init__(self, payload) -> None:
+            self._payload = payload
+
+        def raise_for_status(self) -> None:
+            return None
+
+        def json(self):
+            return self._payload
+
+    client = TodoistEventsClient("token")
+    task = {"id": "t1", "project_id": "p1", "due": {"is_recurring": True}}
+    page = {"results": [{"id": "c1", "content": "delete me"}], "next_cursor": "stuck"}
+
+    def _fake_get(url, **kwargs):
+        return _Resp(task if url.endswith("/tasks/t1") else page)
+
+    ctx = RuleContext(config=_config(), db=FakeDB(), todoist=client)
+    event = TodoistWebhookEvent(
+        delivery_id="d1",
+        event_name="item:completed",
+        user_id="u1",
+        triggered_at=None,
+        task_id="t1",
+        project_id="p1",
+        update_intent=None,
+        raw={},
+    )
+    with patch.object(client._session, "get", side_effect=_fake_get):
+        actions, meta = RecurringClearCommentsOnCompletionRule().plan(ctx, event)
+    assert [(a.action_type, a.target_id) for a in actions] == [("delete_comment", "c1")]
+    assert meta["delete_count"] == 1
+
+
 def test_subtask_rule_plans_recursive_deletes() -> None:
     rule = RecurringPurgeSubtasksOnCompletionRule()
     cfg = _config()
@@ -163,6 +206,59 @@ def test_subtask_rule_respects_cap() -> None:
     assert meta["cap_hit"] is True
 
 
+def test_subtask_rule_skips_project_listing_without_children() -> None:
+    class LeafTodoist(FakeTodoist):
+        def list_active_tasks_for_project(self, project_id: str):
+            raise AssertionError("project listing should not be needed")
+
+        def list_active_subtasks(self, parent_id: str):
+            return []
+
+    rule = RecurringPurgeSubtasksOnCompletionRule()
+    ctx = RuleContext(config=_config(), db=FakeDB(), todoist=LeafTodoist(recurring=True))
+    event = TodoistWebhookEvent(
+        delivery_id="d1",
+        event_name="item:completed",
+        user_id="u1",
+        triggered_at=None,
+        task_id="parent",
+        project_id="p1",
+        update_intent="item_completed",
+        raw={},
+    )
+    actions, meta = rule.plan(ctx, event)
+    assert actions == []
+    assert meta["subtasks_found"] == 0
+
+
+def test_rule_context_shares_task_fetch_across_rules() -> None:
+    class CountingTodoist(FakeTodoist):
+        def __init__(self) -> None:
+            super().__init__(recurring=True)
+            self.get_task_calls = 0
+
+        def get_task(self, task_id: str):
+            self.get_task_calls += 1
+            return super().get_task(task_id)
+
+    todoist = CountingTodoist()
+    ctx = RuleContext(config=_config(), db=FakeDB(), todoist=todoist)
+    event = TodoistWebhookEvent(
+        delivery_id="d1",
+        event_name="item:completed",
+        user_id="u1",
+        triggered_at=None,
+        task_id="parent",
+        project_id="p1",
+        update_intent=None,
+        raw={},
+    )
+    RecurringClearCommentsOnCompletionRule().plan(ctx, event)
+    RecurringPurgeSubtasksOnCompletionRule().plan(ctx, event)
+    assert todoist.get_task_calls == 1
+    assert ctx.cache_hits == 1
+
+
 def test_parse_event_reminder_uses_item_id_for_task() -> None:
     payload = {
         "event_name": "reminder:fired",
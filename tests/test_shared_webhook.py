@@ -2,7 +2,7 @@ import base64
 import hashlib
 import hmac
 
-from todoist_automation_shared.webhook import verify_todoist_signature
+from todoist_automation_shared.webhook import parse_csv_frozenset, verify_todoist_signature
 
 
 def test_verify_todoist_signature_base64() -> None:
@@ -12,5 +12,20 @@ def test_verify_todoist_signature_base64() -> None:
     assert verify_todoist_signature(raw, sig, client_secret=secret)
 
 
+def test_verify_todoist_signature_hex() -> None:
+    secret = "abc123"
+    raw = b'{"hello":"world"}'
+    sig = hmac.new(secret.encode(), raw, hashlib.sha256).hexdigest()
+    assert verify_todoist_signature(raw, sig, client_secret=secret)
+    assert not verify_todoist_signature(raw + b" ", sig, client_secret=secret)
+
+
 def test_verify_todoist_signature_rejects_bad() -> None:
     assert not verify_todoist_signature(b"{}", "bad", client_secret="secret")
+    assert not verify_todoist_signature(b"{}", base64.b64encode(b"short").decode(), client_secret="secret")
+    assert not verify_todoist_signature(b"{}", "sig\u00e9", client_secret="secret")
+
+
+def test_parse_csv_frozenset() -> None:
+    assert parse_csv_frozenset(" a, b,,a ") == frozenset({"a", "b"})
+    assert parse_csv_frozenset(None) == frozenset()
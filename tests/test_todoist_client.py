@@ -1,9 +1,12 @@
+import threading
 from unittest.mock import patch
 
 from autodoist_events_worker.todoist_client import TodoistEventsClient
 
 
 class _Resp:
+    status_code = 200
+
     def __init__(self, payload):
         self._payload = payload
 
@@ -23,7 +26,108 @@ def test_list_comments_reads_results_envelope() -> None:
         ],
         "next_cursor": None,
     }
-    with patch("autodoist_events_worker.todoist_client.requests.get", return_value=_Resp(payload)):
+    with patch.object(client._session, "get", return_value=_Resp(payload)):
+        comments = client.list_comments_for_task("task1")
+    assert [c["id"] for c in comments] == ["c1", "c2"]
+
+
+def test_list_comments_follows_next_cursor() -> None:
+    client = TodoistEventsClient("token")
+    pages = [
+        _Resp({"results": [{"id": "c1"}], "next_cursor": "cur2"}),
+        _Resp({"results": [{"id": "c2"}], "next_cursor": None}),
+    ]
+    cursors = []
+
+    def _fake_get(url, *, params, timeout):
+        cursors.append(params.get("cursor"))
+        return pages.pop(0)
+
+    with patch.object(client._session, "get", side_effect=_fake_get):
         comments = client.list_comments_for_task("task1")
     assert [c["id"] for c in comments] == ["c1", "c2"]
+    assert cursors == [None, "cur2"]
+
+
+def test_list_comments_stops_on_repeated_cursor() -> None:
+    client = TodoistEventsClient("token")
+    page = {"results": [{"id": "c1"}], "next_cursor": "stuck"}
+
+    with patch.object(client._session, "get", return_value=_Resp(page)) as get:
+        comments = client.list_comments_for_task("task1")
+    assert get.call_count == 2
+    assert [c["id"] for c in comments] == ["c1"]
+
+
+def test_sync_delete_maps_status_back_to_commands() -> None:
+    client = TodoistEventsClient("token")
 
+    def _fake_post(url, *, json, timeout):
+        assert url.endswith("/sync")
+        first, second = json["commands"]
+        assert first["type"] == "item_delete" and first["args"] == {"id": "t2"}
+        return _Resp({"sync_status": {first["uuid"]: "ok", second["uuid"]: {"error": "not found"}}})
+
+    with patch.object(client._session, "post", side_effect=_fake_post):
+        statuses = client.sync_delete([("item_delete", "t2"), ("item_delete", "t1")])
+    assert statuses == ["ok", {"error": "not found"}]
+
+
+def test_webhook_delivery_does_not_send_todoist_token() -> None:
+    client = TodoistEventsClient("secret-token")
+    seen: dict = {}
+
+    def _fake_post(url, *, json, headers, timeout):
+        seen["headers"] = headers
+        return _Resp({"ok": True})
+
+    with patch.object(client._external_session, "post", side_effect=_fake_post):
+        client.post_webhook(url="https://hook.example/x", payload={"a": 1})
+    assert "secret-token" not in " ".join(seen["headers"].values())
+    assert not client._external_session.headers.get("Authorization")
+
+
+def test_get_task_reuses_recent_fetch_until_deleted() -> None:
+    client = TodoistEventsClient("token")
+    with patch.object(client._session, "get", return_value=_Resp({"id": "t1"})) as get:
+        assert client.get_task("t1") == {"id": "t1"}
+        assert client.get_task("t1") == {"id": "t1"}
+        assert get.call_count == 1
+        with patch.object(client._session, "post", return_value=_Resp({"sync_status": {}})):
+            client.sync_delete([("item_delete", "t1")])
+        client.get_task("t1")
+        assert get.call_count == 2
+
+
+def test_get_task_merges_concurrent_lookups() -> None:
+    client = TodoistEventsClient("token")
+    release = threading.Event()
+    calls = []
+
+    def _fake_get(url, *, timeout):
+        calls.append(url)
+        release.wait(timeout=5)
+        return _Resp({"id": "t1"})
+
+    results = []
+    with patch.object(client._session, "get", side_effect=_fake_get):
+        threads = [threading.Thread(target=lambda: results.append(client.get_task("t1"))) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        while not calls:
+            pass
+        release.set()
+        for thread in threads:
+            thread.join()
+    assert len(calls) == 1
+    assert results == [{"id": "t1"}] * 4
+
+
+def test_api_retries_are_bounded() -> None:
+    client = TodoistEventsClient("token")
+    retry = client._session.get_adapter("https://api.todoist.com").max_retries
+    assert retry.total == 3
+    assert retry.read == 0
+    assert retry.respect_retry_after_header is False
+    assert retry.allowed_methods == frozenset({"GET"})
+    assert 429 in retry.status_forcelist
@@ -0,0 +1,190 @@
+import base64
+import hashlib
+import hmac
+import json
+
+from autodoist_events_worker.config import EventsConfig
+from autodoist_events_worker.db import EventsDB
+from autodoist_events_worker.rules import Action, RecurringClearCommentsOnCompletionRule
+from autodoist_events_worker.service import create_app
+from autodoist_events_worker.todoist_client import TodoistEventsClient
+
+HOOK_URL = "https://hook.example/agent"
+
+
+def _cfg(tmp_path, **overrides) -> EventsConfig:
+    return EventsConfig(
+        todoist_api_token="token",
+        webhook_client_secret="secret",
+        db_path=str(tmp_path / "events.sqlite"),
+        **overrides,
+    )
+
+
+def _post_completion(client, delivery_id: str = "d1"):
+    body = json.dumps(
+        {"event_name": "item:completed", "user_id": "u1", "event_data": {"id": "t1", "project_id": "p1"}}
+    ).encode()
+    sig = base64.b64encode(hmac.new(b"secret", body, hashlib.sha256).digest()).decode()
+    return client.post(
+        "/hooks/todoist",
+        data=body,
+        headers={"X-Todoist-Hmac-SHA256": sig, "X-Todoist-Delivery-ID": delivery_id},
+        content_type="application/json",
+    )
+
+
+def _plan_actions(monkeypatch, actions: list[Action]) -> None:
+    monkeypatch.setattr(
+        RecurringClearCommentsOnCompletionRule, "plan", lambda self, ctx, event: (list(actions), {"task_id": "t1"})
+    )
+
+
+def _record_calls(monkeypatch, statuses=None) -> list[tuple[str, object]]:
+    calls: list[tuple[str, object]] = []
+
+    def _sync_delete(self, commands):
+        calls.append(("sync", list(commands)))
+        return [(statuses or {}).get(resource_id, "ok") for _, resource_id in commands]
+
+    def _post_webhook(self, *, url, payload, bearer_token=None):
+        calls.append(("webhook", url))
+        return {"status_code": 200}
+
+    monkeypatch.setattr(TodoistEventsClient, "sync_delete", _sync_delete)
+    monkeypatch.setattr(TodoistEventsClient, "post_webhook", _post_webhook)
+    return calls
+
+
+def _actions(tmp_path) -> list[dict]:
+    db = EventsDB(str(tmp_path / "events.sqlite"))
+    db.connect()
+    try:
+        return db.list_actions("d1")
+    finally:
+        db.close()
+
+
+def test_hook_keeps_delete_and_notify_order(monkeypatch, tmp_path) -> None:
+    _plan_actions(
+        monkeypatch,
+        [
+            Action(action_type="delete_comment", target_id="c1"),
+            Action(action_type="notify_webhook", target_type="webhook", target_id=HOOK_URL, meta={"payload": {}}),
+            Action(action_type="delete_comment", target_id="c2"),
+        ],
+    )
+    calls = _record_calls(monkeypatch)
+    resp = _post_completion(create_app(_cfg(tmp_path)).test_client())
+
+    assert resp.status_code == 200
+    assert calls == [
+        ("sync", [("note_delete", "c1")]),
+        ("webhook", HOOK_URL),
+        ("sync", [("note_delete", "c2")]),
+    ]
+    assert [(a["target_id"], a["result"]) for a in _actions(tmp_path)] == [
+        ("c1", "success"),
+        (HOOK_URL, "success"),
+        ("c2", "success"),
+    ]
+
+
+def test_hook_splits_deletes_into_sync_batches(monkeypatch, tmp_path) -> None:
+    _plan_actions(
+        monkeypatch,
+        [Action(action_type="delete_task", target_type="task", target_id=f"t{i}") for i in range(150)],
+    )
+    calls = _record_calls(monkeypatch)
+    resp = _post_completion(create_app(_cfg(tmp_path)).test_client())
+
+    assert resp.status_code == 200
+    assert [len(commands) for _, commands in calls] == [100, 50]
+    assert resp.get_json()["outcomes"][0]["deleted"] == 150
+
+
+def test_hook_marks_only_the_failed_sync_command(monkeypatch, tmp_path) -> None:
+    _plan_actions(monkeypatch, [Action(action_type="delete_comment", target_id=c) for c in ("c1", "c2", "c3")])
+    _record_calls(monkeypatch, statuses={"c2": {"error": "Comment not found"}})
+    resp = _post_completion(create_app(_cfg(tmp_path)).test_client())
+
+    assert resp.status_code == 200
+    rows = {a["target_id"]: a for a in _actions(tmp_path)}
+    assert [rows[c]["result"] for c in ("c1", "c2", "c3")] == ["success", "failed", "success"]
+    assert json.loads(rows["c2"]["meta_json"]) == {"reason": "sync_error", "error": {"error": "Comment not found"}}
+    assert resp.get_json()["outcomes"][0]["deleted"] == 2
+
+
+def test_hook_dry_run_sends_no_sync_request(monkeypatch, tmp_path) -> None:
+    _plan_actions(monkeypatch, [Action(action_type="delete_comment", target_id="c1")])
+    calls = _record_calls(monkeypatch)
+    resp = _post_completion(create_app(_cfg(tmp_path, dry_run=True)).test_client())
+
+    assert resp.status_code == 200
+    assert calls == []
+    assert [a["result"] for a in _actions(tmp_path)] == ["skipped"]
+
+
+def test_hook_keeps_audit_rows_from_batches_before_a_failure(monkeypatch, tmp_path) -> None:
+    _plan_actions(
+        monkeypatch,
+        [Action(action_type="delete_task", target_type="task", target_id=f"t{i}") for i in range(150)],
+    )
+    batches: list[int] = []
+
+    def _sync_delete(self, commands):
+        if batches:
+            raise RuntimeError("sync unavailable")
+        batches.append(len(commands))
+        return ["ok"] * len(commands)
+
+    monkeypatch.setattr(TodoistEventsClient, "sync_delete", _sync_delete)
+    app = create_app(_cfg(tmp_path))
+    resp = _post_completion(app.test_client())
+
+    assert resp.status_code == 500
+    db = EventsDB(str(tmp_path / "events.sqlite"))
+    db.connect()
+    try:
+        assert db.get_receipt("d1")["status"] == "error"
+        actions = db.list_actions("d1")
+    finally:
+        db.close()
+    assert len(actions) == 100
+    assert {a["result"] for a in actions} == {"success"}
+
+
+def test_hook_cache_counters_match_client_calls(monkeypatch, tmp_path) -> None:
+    fetches: list[str] = []
+
+    def _record(name, result):
+        def _call(self, *args):
+            fetches.append(name)
+            return result
+
+        return _call
+
+    monkeypatch.setattr(
+        TodoistEventsClient, "get_task", _record("get_task", {"id": "t1", "due": {"is_recurring": True}})
+    )
+    monkeypatch.setattr(
+        TodoistEventsClient, "list_comments_for_task", _record("comments", [{"id": "c1", "content": "x"}])
+    )
+    monkeypatch.setattr(
+        TodoistEventsClient, "list_active_subtasks", _record("subtasks", [{"id": "s1", "parent_id": "t1"}])
+    )
+    monkeypatch.setattr(
+        TodoistEventsClient, "list_active_tasks_for_project", _record("project", [{"id": "s1", "parent_id": "t1"}])
+    )
+    _record_calls(monkeypatch)
+    app = create_app(_cfg(tmp_path, rule_recurring_purge_subtasks=True))
+    resp = _post_completion(app.test_client())
+
+    assert resp.status_code == 200
+    outcomes = {o["rule"]: o for o in resp.get_json()["outcomes"]}
+    clear = outcomes["recurring_clear_comments_on_completion"]
+    purge = outcomes["recurring_purge_subtasks_on_completion"]
+    assert (clear["cache_hits"], clear["cache_misses"]) == (0, 2)
+    assert (purge["cache_hits"], purge["cache_misses"]) == (1, 2)
+    assert fetches == ["get_task", "comments", "subtasks", "project"]
+    assert clear["cache_misses"] + purge["cache_misses"] == len(fetches)